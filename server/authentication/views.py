@@ -4,6 +4,7 @@ from rest_framework import status, serializers
 from django.contrib.auth import authenticate, get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from drf_spectacular.utils import extend_schema, extend_schema_serializer
+from orders.guest import merge_guest_cart, token_from_request
 
 User = get_user_model()
 
@@ -15,6 +16,8 @@ class LoginOrRegisterView(APIView):
     - user_id: the id of the user
     - email: the email of the user
     - tokens: the access and refresh tokens
+
+    a guest cart sent along (X-Cart-Token header) is merged into the user's cart
     """
 
     @extend_schema_serializer(component_name="LoginInputSerializer")
@@ -74,7 +77,10 @@ class LoginOrRegisterView(APIView):
             except Exception as e:
                 return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # 2. generate tokens 
+        # 2. fold the guest cart, if any, into the user's cart
+        merge_guest_cart(user, token_from_request(request))
+
+        # 3. generate tokens 
         refresh = RefreshToken.for_user(user)
         response_data = {
             "message": action,
@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import IdempotencyKey
 
-# Register your models here.
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ("id", "key", "scope", "response_status", "created_at", "expires_at")
+    search_fields = ("key", "scope")
+    readonly_fields = ("scope", "key", "fingerprint", "response_status", "response_body", "response_headers", "created_at")
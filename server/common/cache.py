@@ -0,0 +1,82 @@
+"""
+Namespace versions for cache invalidation.
+
+Cached entries embed the current version of their namespace in the key, so
+invalidating a whole namespace is a single write: bump the version and every
+old key simply stops being read (and ages out on its own timeout).
+
+The versions live in the database (CacheVersion), which every process shares,
+so a bump from a management command or the outbox drain reaches every web
+process even though the entries themselves sit in a per-process cache.
+
+Each process reuses a version it read for CACHE_VERSION_TTL seconds, so warm
+reads cost no query; a bump from another process shows up within that TTL,
+one from this process right away.
+
+Versions are random tokens rather than counters, so a recreated version row
+can only ever cause a miss, never a stale hit.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import CacheVersion
+
+# namespace -> (version, monotonic time it was read)
+_versions = {}
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def get_version(namespace):
+    memo = _versions.get(namespace)
+    if memo is not None and time.monotonic() - memo[1] < settings.CACHE_VERSION_TTL:
+        return memo[0]
+
+    version = CacheVersion.objects.filter(namespace=namespace).values_list("version", flat=True).first()
+    if version is None:
+        # get_or_create so we never overwrite a version someone just bumped
+        version = CacheVersion.objects.get_or_create(
+            namespace=namespace, defaults={"version": _new_version()},
+        )[0].version
+
+    _versions[namespace] = (version, time.monotonic())
+    return version
+
+
+def bump_version(namespace):
+    """invalidates every key of the namespace once the current transaction commits"""
+    def bump():
+        version = _new_version()
+        CacheVersion.objects.update_or_create(namespace=namespace, defaults={"version": version})
+        _versions[namespace] = (version, time.monotonic())
+
+    transaction.on_commit(bump)
+
+
+def versioned_key(namespace, *parts):
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f"{namespace}:{get_version(namespace)}:{digest}"
+
+
+def get_or_build(key, build, timeout=None):
+    """read-through helper, `build` is only called on a miss"""
+    cache = get_cache()
+
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        if value is not None:
+            cache.set(key, value, timeout=timeout or settings.API_CACHE_TIMEOUT)
+
+    return value
@@ -0,0 +1,50 @@
+"""
+Conditional GET support (ETag / Last-Modified) for DRF view methods.
+
+Validators are computed before the view body runs, so a matching
+If-None-Match / If-Modified-Since is answered with a 304 without loading
+or serializing anything.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def conditional(validators, private=False):
+    """
+    validators(view, request, *args, **kwargs) -> (etag, last_modified)
+    either value may be None, in which case the view runs unconditionally.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag, last_modified = validators(self, request, *args, **kwargs)
+
+            etag = quote_etag(etag) if etag else None
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                if etag:
+                    response.headers["ETag"] = etag
+                if timestamp:
+                    response.headers["Last-Modified"] = http_date(timestamp)
+
+                # let browsers keep the body but revalidate every time
+                if private:
+                    patch_cache_control(response, private=True, no_cache=True)
+                else:
+                    patch_cache_control(response, no_cache=True)
+
+            return response
+        return wrapper
+    return decorator
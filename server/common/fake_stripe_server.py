@@ -0,0 +1,217 @@
+"""
+A local HTTP server speaking the slice of the Stripe API this app uses.
+
+Point the real client at it (STRIPE_API_BASE=http://127.0.0.1:12111) and the
+whole stack, SDK and HTTP pool included, runs without touching Stripe:
+
+- POST /v1/products, POST /v1/products/<id>, GET /v1/products/<id>
+- POST /v1/coupons, GET /v1/coupons/<id>, DELETE /v1/coupons/<id>
+- POST /v1/checkout/sessions, GET /v1/checkout/sessions/<id>
+
+Creates honour the Idempotency-Key header like Stripe does. Latency, a
+request rate limit (429s) and random 500s can be injected. Webhooks are the
+other direction: `checkout_completed_event` builds an event for a session
+and `sign_webhook` signs it the way Stripe does, so the webhook view verifies
+it for real.
+
+Run it standalone with `manage.py fake_stripe_server`.
+"""
+import collections
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+ROUTES = {
+    "products": ("prod", "product"),
+    "coupons": ("coupon", "coupon"),
+    "checkout/sessions": ("cs", "checkout.session"),
+}
+
+
+def decode_form(body):
+    """Stripe's form encoding (a[b][0][c]=1) back into dicts and lists"""
+    root = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        parts = re.findall(r"[^\[\]]+", key)
+        node = root
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+    def convert(node, raw=False):
+        if not isinstance(node, dict):
+            # Stripe types values by its schema, integers and booleans are enough here
+            if raw:
+                return node
+            if re.fullmatch(r"-?\d+", node):
+                return int(node)
+            return {"true": True, "false": False}.get(node, node)
+
+        # metadata values stay strings, like on Stripe
+        node = {key: convert(value, raw or key == "metadata") for key, value in node.items()}
+        if node and all(key.isdigit() for key in node):
+            return [node[key] for key in sorted(node, key=int)]
+        return node
+
+    return convert(root)
+
+
+def sign_webhook(payload, secret, timestamp=None):
+    """the Stripe-Signature header for a payload, as Stripe computes it"""
+    timestamp = int(timestamp or time.time())
+    if isinstance(payload, bytes):
+        payload = payload.decode()
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def checkout_completed_event(session):
+    return {
+        "id": f"evt_fake_{random.getrandbits(64):x}",
+        "object": "event",
+        "type": "checkout.session.completed",
+        "created": int(time.time()),
+        "data": {"object": session},
+    }
+
+
+class FakeStripeServer:
+    """
+    latency: seconds added to every request
+    error_rate: share of requests (0..1) answered with a 500
+    rate_limit: requests per second before 429s
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0, error_rate=0, rate_limit=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+
+        self.objects = {route: {} for route in ROUTES}
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._recent = collections.deque()
+        self._idempotent = {}
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def _throttled(self):
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                return True
+            self._recent.append(now)
+            return False
+
+    def handle(self, method, path, body, idempotency_key):
+        """returns (status, json body)"""
+        with self._lock:
+            self.requests += 1
+
+        if self._throttled():
+            return 429, error("rate_limit_error", "Too many requests (fake)")
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            return 500, error("api_error", "Injected error (fake)")
+
+        match = re.fullmatch(r"/v1/(products|coupons|checkout/sessions)(?:/([\w-]+))?", path)
+        if not match:
+            return 404, error("invalid_request_error", f"Unrecognized request URL ({method}: {path})")
+        route, object_id = match.groups()
+        store = self.objects[route]
+
+        if object_id:
+            obj = store.get(object_id)
+            if obj is None:
+                return 404, error("invalid_request_error", f"No such {ROUTES[route][1]}: '{object_id}'")
+            if method == "POST":
+                obj.update(decode_form(body))
+            elif method == "DELETE":
+                del store[object_id]
+                return 200, {"id": object_id, "object": obj["object"], "deleted": True}
+            return 200, obj
+
+        if method != "POST":
+            return 405, error("invalid_request_error", "Listing is not supported by the fake")
+
+        with self._lock:
+            if idempotency_key and idempotency_key in self._idempotent:
+                return 200, self._idempotent[idempotency_key]
+
+            prefix, kind = ROUTES[route]
+            obj = {"id": f"{prefix}_fake_{next(self._ids)}", "object": kind, "created": int(time.time())}
+            obj.update(decode_form(body))
+            if kind == "checkout.session":
+                obj.update(url=f"https://checkout.stripe.test/{obj['id']}", status="open", payment_status="unpaid")
+            store[obj["id"]] = obj
+            if idempotency_key:
+                self._idempotent[idempotency_key] = obj
+        return 200, obj
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, so the client's connection pool is exercised
+            protocol_version = "HTTP/1.1"
+            # headers and body leave in one write, no Nagle / delayed ACK stalls
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                path = self.path.split("?", 1)[0]
+
+                status, payload = server.handle(self.command, path, body, self.headers.get("Idempotency-Key"))
+
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Request-Id", f"req_fake_{random.getrandbits(48):x}")
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_DELETE = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def error(kind, message):
+    return {"error": {"type": kind, "message": message}}
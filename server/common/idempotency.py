@@ -0,0 +1,159 @@
+"""
+Idempotency-Key support for DRF write methods.
+
+A client sends the same Idempotency-Key header when it retries a request
+(double click, timeout). The first request runs normally and its response is
+stored; every replay within IDEMPOTENCY_KEY_TTL gets that stored response
+back without the view running again.
+
+- a key reused for a different request (method, path or body) gets a 422
+- a replay that arrives while the first request is still running gets a 409
+- the first request holds the key for IDEMPOTENCY_LEASE seconds; if it died
+  without storing a response, a replay after that takes the key over and runs
+- 5xx responses and exceptions are not stored, so the client can retry
+- a scope of None (nothing identifies the client yet) skips all of the above
+
+Requests without the header are not affected. Expired rows are deleted by
+`manage.py purge_idempotency_keys`.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def default_scope(request):
+    # anonymous callers would all share one scope
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return None
+
+
+def fingerprint(request, *args, **kwargs):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    raw = "|".join([request.method, request.path, json.dumps(kwargs, sort_keys=True, default=str), body])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def claim(scope, key, request_fingerprint):
+    """returns (row, owned), the caller owns the row when it has to run the request"""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    locked_until = now + timedelta(seconds=settings.IDEMPOTENCY_LEASE)
+
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                scope=scope, key=key, fingerprint=request_fingerprint,
+                expires_at=expires_at, locked_until=locked_until,
+            ), True
+    except IntegrityError:
+        pass
+
+    row = IdempotencyKey.objects.get(scope=scope, key=key)
+    if row.expires_at <= now:
+        # an expired key the purge hasn't removed yet, the request starts over
+        row.delete()
+        return claim(scope, key, request_fingerprint)
+
+    stale = row.locked_until is None or row.locked_until <= now
+    if row.response_status is None and stale and row.fingerprint == request_fingerprint:
+        # the first request died before storing its response; only one retry wins the takeover
+        taken = IdempotencyKey.objects.filter(
+            id=row.id, response_status__isnull=True, locked_until=row.locked_until
+        ).update(locked_until=locked_until)
+        if taken:
+            row.locked_until = locked_until
+            return row, True
+    return row, False
+
+
+def owned(row):
+    """the row while it is still ours, a request that overran its lease may have lost it"""
+    return IdempotencyKey.objects.filter(id=row.id, locked_until=row.locked_until)
+
+
+def replay(row):
+    response = Response(row.response_body, status=row.response_status)
+    for name, value in row.response_headers.items():
+        response.headers[name] = value
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def idempotent(scope=default_scope):
+    """
+    scope(request) -> str namespaces keys, by default per user, so two
+    clients can't read each other's responses by guessing a key. A scope of
+    None runs the request without idempotency.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return method(self, request, *args, **kwargs)
+
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            key_scope = scope(request)
+            if key_scope is None:
+                return method(self, request, *args, **kwargs)
+
+            request_fingerprint = fingerprint(request, *args, **kwargs)
+            row, created = claim(key_scope, key, request_fingerprint)
+
+            if not created:
+                if row.fingerprint != request_fingerprint:
+                    return Response(
+                        {"error": f"{HEADER} was already used for a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if row.response_status is None:
+                    return Response(
+                        {"error": "A request with this Idempotency-Key is still being processed"},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                return replay(row)
+
+            try:
+                response = method(self, request, *args, **kwargs)
+            except Exception:
+                owned(row).delete()
+                raise
+
+            if response.status_code >= 500:
+                owned(row).delete()
+                return response
+
+            owned(row).update(
+                response_status=response.status_code,
+                response_body=response.data,
+                response_headers={
+                    name: value for name, value in response.headers.items()
+                    if name.lower() != "content-type"
+                },
+                locked_until=None,
+            )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,145 @@
+"""
+Small key-value stores with TTL eviction (guest carts).
+
+- DatabaseStore: the KeyValue table, shared by every process (the default)
+- InMemoryStore: per-process dict, for tests and single-process dev runs
+- CacheStore: any Django cache alias, shared only when that cache is
+
+Code asks `get_kv_store()` for the configured store (KV_STORE setting),
+`set_kv_store()` swaps it, the same way as the Stripe client.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import KeyValue
+
+
+class InMemoryStore:
+    """dict with per-key expiry, expired keys are dropped on read and swept on write"""
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._writes += 1
+            if self._writes % self.SWEEP_EVERY == 0:
+                self._sweep()
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def _sweep(self):
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._data.items() if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DatabaseStore:
+    """rows of the KeyValue table, so every worker and a restart see the same data
+
+    values have to be JSON serializable. a set is a single upsert, expired rows
+    are ignored on read and swept every SWEEP_EVERY writes of the process.
+    """
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self):
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        live = Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+        values = list(KeyValue.objects.filter(live, key=key).values_list("value", flat=True)[:1])
+        return values[0] if values else default
+
+    def set(self, key, value, ttl=None):
+        expires_at = timezone.now() + timedelta(seconds=ttl) if ttl else None
+        KeyValue.objects.bulk_create(
+            [KeyValue(key=key, value=value, expires_at=expires_at)],
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["value", "expires_at"],
+        )
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % self.SWEEP_EVERY == 0
+        if sweep:
+            KeyValue.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    def delete(self, key):
+        KeyValue.objects.filter(key=key).delete()
+
+
+class CacheStore:
+    """backed by a Django cache, shared by every process when the cache is"""
+
+    def __init__(self, alias="default", prefix="kv"):
+        self.alias = alias
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key, default=None):
+        return self.cache.get(self._key(key), default)
+
+    def set(self, key, value, ttl=None):
+        self.cache.set(self._key(key), value, timeout=ttl)
+
+    def delete(self, key):
+        self.cache.delete(self._key(key))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_kv_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = import_string(settings.KV_STORE)()
+    return _store
+
+
+def set_kv_store(store):
+    """swaps the process-wide store, returns the previous one"""
+    global _store
+    with _store_lock:
+        previous, _store = _store, store
+    return previous
@@ -0,0 +1,133 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from coupons.models import Coupon, PromotionSlot
+from orders.models import CartItem, Order, OrderItem, StripeEvent
+from products.models import Product, ProductOutbox
+
+PAGE = 14  # REST_FRAMEWORK PAGE_SIZE
+
+# SQLite: "SCAN <table>" without an index is a full table scan
+SQLITE_SCAN = re.compile(r"\bSCAN (\w+)(.*)$")
+# Postgres
+POSTGRES_SCAN = re.compile(r"\bSeq Scan on (\w+)")
+
+
+def representative_queries():
+    """(endpoint, query) pairs, built the way the views build them
+
+    the parameter values don't matter, only the shape of the query does.
+    """
+    user_id = 1
+    now = timezone.now()
+    return [
+        # GET /orders/ and /orders/<pk>/
+        ("orders list", Order.objects.filter(user_id=user_id).order_by("-created_at")[:PAGE]),
+        ("orders list items", OrderItem.objects.filter(order_id__in=[1, 2, 3])),
+        ("orders detail", Order.objects.filter(user_id=user_id, pk=1)),
+        # admin order filter, stale PENDING orders
+        ("admin orders by status", Order.objects.filter(status="PAID").order_by("-created_at")[:100]),
+        ("stale pending orders", Order.objects.filter(status="PENDING", created_at__lt=now - timedelta(hours=1))),
+        # cart and checkout
+        ("cart items", CartItem.objects.filter(cart__owner_id=user_id).select_related("product")),
+        ("checkout coupon", Coupon.objects.filter(code="LUCKY-ABC")),
+        ("checkout products", Product.objects.filter(id__in=[1, 2, 3])),
+        # coupons
+        ("open coupons of a user", Coupon.objects.filter(reserved_by_user_id=user_id, is_used=False, expires_at__gt=now)),
+        ("promotion slot", PromotionSlot.objects.filter(slot_number=5, claimed_by__isnull=True)),
+        ("sweeper expired reservations", Coupon.objects.filter(
+            is_used=False, is_active=True, expires_at__lt=now,
+        ).order_by("expires_at")[:500]),
+        ("sweeper stripe cleanup", Coupon.objects.filter(
+            is_used=False, is_active=False, stripe_coupon_id__isnull=False, expires_at__lt=now,
+        ).order_by("expires_at")[:500]),
+        # catalog
+        ("catalog list", Product.objects.order_by("-id")[:PAGE]),
+        ("catalog cursor page", Product.objects.filter(created_at__lt=now).order_by("-created_at", "-id")[:PAGE]),
+        ("catalog detail", Product.objects.filter(pk=1)),
+        ("admin products by is_active", Product.objects.filter(is_active=True).order_by("-created_at")[:100]),
+        # background queues
+        ("stripe events due", StripeEvent.objects.filter(status=StripeEvent.PENDING, available_at__lte=now)
+            .order_by("id")[:100]),
+        ("product outbox due", ProductOutbox.objects.filter(status=ProductOutbox.PENDING, available_at__lte=now)
+            .order_by("id")[:100]),
+    ]
+
+
+def walks_primary_key(queryset):
+    """ordered by the primary key and limited: SQLite reads the table's own
+    b-tree in order and stops at the limit, but still reports "SCAN <table>"
+    """
+    query = queryset.query
+    order_by = query.order_by or queryset.model._meta.ordering
+    pk = queryset.model._meta.pk.name
+    return query.high_mark is not None and bool(order_by) and order_by[0].lstrip("-") in (pk, "pk")
+
+
+def full_scans(queryset, plan):
+    """tables the plan reads in full"""
+    if connection.vendor == "postgresql":
+        return POSTGRES_SCAN.findall(plan)
+
+    tables = []
+    for line in plan.splitlines():
+        match = SQLITE_SCAN.search(line)
+        if not match or "USING INDEX" in match[2] or "USING COVERING INDEX" in match[2]:
+            continue
+        if match[1] == queryset.model._meta.db_table and walks_primary_key(queryset):
+            continue
+        tables.append(match[1])
+    return tables
+
+
+def explain(queryset):
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # an empty or small table is cheaper to read in full, so without
+            # this the plan says nothing about which indexes could be used
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs EXPLAIN on the representative queries of each endpoint and fails '
+        'if any of them reads a whole table instead of using an index'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--current-db', action='store_true',
+                            help='Explain against the configured database instead of a throwaway one')
+
+    def handle(self, *args, **options):
+        old_name = None
+        if not options['current_db']:
+            # freshly migrated, so the plans are those of the current migrations
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            failures = []
+            for endpoint, queryset in representative_queries():
+                plan = explain(queryset)
+                scans = full_scans(queryset, plan)
+                if scans:
+                    failures.append(endpoint)
+                    self.stdout.write(self.style.ERROR(f"FULL SCAN  {endpoint}: {', '.join(scans)}"))
+                else:
+                    self.stdout.write(f"ok         {endpoint}")
+                if scans or options['verbosity'] > 1:
+                    self.stdout.write(f"    {queryset.query}")
+                    for line in plan.splitlines():
+                        self.stdout.write(f"    {line}")
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if failures:
+            raise CommandError(f"{len(failures)} queries fall back to a full scan: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("Every query uses an index."))
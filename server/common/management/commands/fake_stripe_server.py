@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from common.fake_stripe_server import FakeStripeServer
+
+
+class Command(BaseCommand):
+    help = 'Runs a local fake of the Stripe API (set STRIPE_API_BASE to its URL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every request')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+        parser.add_argument('--rate-limit', type=int, default=None, help='Requests per second before 429s')
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Fake Stripe listening on {server.url}"))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            self.stdout.write(f"Served {server.requests} requests.")
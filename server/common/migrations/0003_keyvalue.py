@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:32
+
+import django.core.serializers.json
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_cacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeyValue',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('value', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
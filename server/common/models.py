@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 import uuid
 
@@ -6,4 +7,51 @@ class BaseModel(models.Model):
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, db_index=True)
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+class CacheVersion(BaseModel):
+    """the current version of a cache namespace, see common/cache.py
+
+    kept in the database so a bump from any process (a management command,
+    the outbox drain) invalidates the cache of every web process
+    """
+    namespace = models.CharField(max_length=100, unique=True)
+    version = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.namespace} @ {self.version}"
+
+class KeyValue(BaseModel):
+    """an entry of common.kv.DatabaseStore"""
+    key = models.CharField(max_length=255, unique=True)
+    value = models.JSONField(encoder=DjangoJSONEncoder)
+    # null: never expires
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+class IdempotencyKey(BaseModel):
+    """a client supplied Idempotency-Key and the response it got, see common/idempotency.py"""
+    scope = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+
+    # empty while the first request is still running
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    # until then the first request owns the key, after that a retry may take it over
+    locked_until = models.DateTimeField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    response_headers = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="idempotency_key_unique_per_scope"),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.scope})"
@@ -0,0 +1,399 @@
+"""
+Stripe client used by the app.
+
+Code that needs Stripe asks `get_stripe_client()` for a client instead of
+calling the SDK directly. What it gets is a ResilientStripeClient wrapping
+the transport named by the STRIPE_CLIENT setting:
+
+- StripeClient: the real API, over one pooled HTTP session with a timeout
+- FakeStripeClient: in memory, for tests, local runs and benchmarks
+
+The wrapper adds what every call site needs: bounded retries with backoff
+(429s only outside a SyncEngine, which handles those itself), a circuit
+breaker that fails fast while Stripe is down, and per-operation latency /
+error metrics. `set_stripe_client()` swaps the whole thing.
+"""
+import collections
+import itertools
+import logging
+import random
+import threading
+import time
+import uuid
+
+import requests
+import stripe
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+from .sync_engine import handles_rate_limits
+
+logger = logging.getLogger(__name__)
+
+
+class StripeClient:
+    """talks to the real Stripe API, one pooled HTTP session shared by all threads"""
+
+    def __init__(self, api_key=None, timeout=None, pool_size=None, api_base=None):
+        self.api_key = api_key or settings.STRIPE_API_KEY
+        self.timeout = timeout or settings.STRIPE_TIMEOUT
+        self.pool_size = pool_size or settings.STRIPE_POOL_SIZE
+        self.api_base = api_base or settings.STRIPE_API_BASE
+        self._sdk = None
+        self._lock = threading.Lock()
+
+    @property
+    def sdk(self):
+        # built on first use, so a process without a key can still import this
+        if self._sdk is None:
+            with self._lock:
+                if self._sdk is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+
+                    self._sdk = stripe.StripeClient(
+                        self.api_key,
+                        http_client=stripe.RequestsClient(timeout=self.timeout, session=session),
+                        # retries are done by ResilientStripeClient
+                        max_network_retries=0,
+                        base_addresses={"api": self.api_base} if self.api_base else None,
+                    )
+        return self._sdk
+
+    def _options(self, idempotency_key):
+        return {"idempotency_key": idempotency_key} if idempotency_key else None
+
+    def create_product(self, idempotency_key=None, **params):
+        return self.sdk.v1.products.create(params, self._options(idempotency_key))
+
+    def modify_product(self, product_id, **params):
+        return self.sdk.v1.products.update(product_id, params)
+
+    def create_coupon(self, idempotency_key=None, **params):
+        return self.sdk.v1.coupons.create(params, self._options(idempotency_key))
+
+    def create_checkout_session(self, idempotency_key=None, **params):
+        return self.sdk.v1.checkout.sessions.create(params, self._options(idempotency_key))
+
+    def delete_coupon(self, coupon_id):
+        return self.sdk.v1.coupons.delete(coupon_id)
+
+    def construct_event(self, payload, sig_header, secret):
+        return stripe.Webhook.construct_event(payload, sig_header, secret)
+
+
+class FakeObject(dict):
+    """dict with attribute access, close enough to a StripeObject for our callers"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class FakeStripeClient:
+    """in-memory stand-in for StripeClient, keeps every object it creates
+
+    latency: seconds each call takes
+    rate_limit: requests per second before calls start failing with a 429
+    error_rate: share of calls (0..1) failing with a connection error
+    """
+
+    def __init__(self, latency=0, rate_limit=None, error_rate=0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+
+        self.products = {}
+        self.coupons = {}
+        self.sessions = {}
+        self.calls = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._recent = collections.deque()
+        self._idempotent = {}
+
+    def _simulate(self):
+        if self.rate_limit:
+            with self._lock:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 1:
+                    self._recent.popleft()
+                if len(self._recent) >= self.rate_limit:
+                    raise stripe.error.RateLimitError("Too many requests (fake)", http_status=429)
+                self._recent.append(now)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.error_rate and random.random() < self.error_rate:
+            raise stripe.error.APIConnectionError("Injected error (fake)")
+
+    def _new_id(self, prefix):
+        with self._lock:
+            return f"{prefix}_fake_{next(self._ids)}"
+
+    def _create(self, store, prefix, kind, idempotency_key, params):
+        self._simulate()
+        # like Stripe, a retried create with the same key returns the first object
+        if idempotency_key and idempotency_key in self._idempotent:
+            return self._idempotent[idempotency_key]
+
+        obj = FakeObject(id=self._new_id(prefix), object=kind, **params)
+        store[obj.id] = obj
+        self.calls.append((f"create_{kind.replace('.', '_')}", obj.id))
+        if idempotency_key:
+            self._idempotent[idempotency_key] = obj
+        return obj
+
+    def create_product(self, idempotency_key=None, **params):
+        return self._create(self.products, "prod", "product", idempotency_key, params)
+
+    def modify_product(self, product_id, **params):
+        self._simulate()
+        if product_id not in self.products:
+            raise stripe.error.InvalidRequestError(f"No such product: '{product_id}'", "id")
+        self.products[product_id].update(params)
+        self.calls.append(("modify_product", product_id))
+        return self.products[product_id]
+
+    def create_coupon(self, idempotency_key=None, **params):
+        return self._create(self.coupons, "coupon", "coupon", idempotency_key, params)
+
+    def delete_coupon(self, coupon_id):
+        self._simulate()
+        if self.coupons.pop(coupon_id, None) is None:
+            raise stripe.error.InvalidRequestError(f"No such coupon: '{coupon_id}'", "id", http_status=404)
+        self.calls.append(("delete_coupon", coupon_id))
+        return FakeObject(id=coupon_id, object="coupon", deleted=True)
+
+    def create_checkout_session(self, idempotency_key=None, **params):
+        session = self._create(self.sessions, "cs", "checkout.session", idempotency_key, params)
+        session.setdefault("url", f"https://checkout.stripe.test/{session.id}")
+        return session
+
+    def construct_event(self, payload, sig_header, secret):
+        # signatures are checked locally by the SDK, so the fake does the real thing
+        return stripe.Webhook.construct_event(payload, sig_header, secret)
+
+
+class CircuitOpenError(stripe.error.APIConnectionError):
+    """raised without calling Stripe while the breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through, consecutive failures are counted
+    open: after `threshold` failures, calls fail fast for `reset_timeout` seconds
+    half open: then one trial call is let through, success closes, failure reopens
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Stripe circuit breaker is open, not calling Stripe")
+                self.state = self.HALF_OPEN
+
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpenError("Stripe circuit breaker is half open, trial call running")
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    logger.error(f"Stripe circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_neutral(self):
+        """a call that says nothing about Stripe's health, e.g. a 4xx or a 429"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self.failures = 0
+            self._trial_running = False
+
+
+class Metrics:
+    """per operation call / error / retry counts and recent latencies"""
+
+    SAMPLES = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def _op(self, name):
+        op = self._ops.get(name)
+        if op is None:
+            op = self._ops[name] = {
+                "calls": 0, "errors": 0, "retries": 0, "rejected": 0,
+                "latencies": collections.deque(maxlen=self.SAMPLES),
+            }
+        return op
+
+    def record(self, name, elapsed, error=None):
+        with self._lock:
+            op = self._op(name)
+            op["calls"] += 1
+            op["latencies"].append(elapsed)
+            if error is not None:
+                op["errors"] += 1
+
+    def increment(self, name, counter):
+        with self._lock:
+            self._op(name)[counter] += 1
+
+    def snapshot(self):
+        """{operation: {calls, errors, retries, rejected, p50_ms, p95_ms, p99_ms}}"""
+        with self._lock:
+            result = {}
+            for name, op in self._ops.items():
+                latencies = sorted(op["latencies"])
+                stats = {key: op[key] for key in ("calls", "errors", "retries", "rejected")}
+                for p in (50, 95, 99):
+                    stats[f"p{p}_ms"] = (
+                        round(latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000, 2)
+                        if latencies else None
+                    )
+                result[name] = stats
+            return result
+
+
+def is_retryable(error):
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    return isinstance(error, stripe.error.APIError) and (error.http_status or 500) >= 500
+
+
+def is_outage(error):
+    """errors that say Stripe is unhealthy, as opposed to a bad request or a 429"""
+    if isinstance(error, stripe.error.RateLimitError):
+        return False
+    return is_retryable(error)
+
+
+class ResilientStripeClient:
+    """retries, circuit breaker and metrics around any client with our methods"""
+
+    def __init__(self, inner, max_retries=None, backoff_base=0.25, backoff_max=4, breaker=None, metrics=None):
+        self.inner = inner
+        self.max_retries = settings.STRIPE_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(settings.STRIPE_BREAKER_THRESHOLD, settings.STRIPE_BREAKER_RESET)
+        self.metrics = metrics or Metrics()
+
+    def call(self, operation, /, *args, **kwargs):
+        func = getattr(self.inner, operation)
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self.metrics.increment(operation, "rejected")
+                raise
+
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except stripe.error.StripeError as e:
+                self.metrics.record(operation, time.perf_counter() - started, error=e)
+                if is_outage(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_neutral()
+
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                if isinstance(e, stripe.error.RateLimitError) and handles_rate_limits():
+                    # the SyncEngine backs off through its token bucket, retrying here too would multiply the calls
+                    raise
+
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                self.metrics.increment(operation, "retries")
+                logger.warning(f"Stripe {operation} failed ({e}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            self.metrics.record(operation, time.perf_counter() - started)
+            self.breaker.record_success()
+            return result
+
+    def _create(self, operation, params):
+        # one key for every attempt, so a retry after a lost response can't create twice
+        params.setdefault("idempotency_key", uuid.uuid4().hex)
+        return self.call(operation, **params)
+
+    def create_product(self, **params):
+        return self._create("create_product", params)
+
+    def modify_product(self, product_id, **params):
+        return self.call("modify_product", product_id, **params)
+
+    def create_coupon(self, **params):
+        return self._create("create_coupon", params)
+
+    def create_checkout_session(self, **params):
+        return self._create("create_checkout_session", params)
+
+    def delete_coupon(self, coupon_id):
+        return self.call("delete_coupon", coupon_id)
+
+    def construct_event(self, payload, sig_header, secret):
+        """verifies a webhook signature, local only, so no retries or breaker"""
+        return self.inner.construct_event(payload, sig_header, secret)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_stripe_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ResilientStripeClient(import_string(settings.STRIPE_CLIENT)())
+    return _client
+
+
+def set_stripe_client(client):
+    """swaps the process-wide client, returns the previous one
+
+    pass `ResilientStripeClient(FakeStripeClient())` to keep retries and the
+    breaker in play, a bare FakeStripeClient to skip them.
+    """
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
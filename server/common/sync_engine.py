@@ -0,0 +1,181 @@
+"""
+Concurrent, rate-limited runner for Stripe calls.
+
+- a thread pool runs the calls, with a bounded number of tasks in flight
+- a token bucket caps the request rate (requests per second, shared by all workers)
+- 429s are retried with exponential backoff and full jitter, here only:
+  ResilientStripeClient leaves them to the engine (`handles_rate_limits()`)
+- an optional checkpoint file records finished keys so a rerun skips them
+- a progress callback is called about once a second
+
+Tasks run on worker threads: they should only call Stripe and touch
+in-memory objects, database writes belong to the caller.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import stripe
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def handles_rate_limits():
+    """True on a thread that is running a SyncEngine call, which retries 429s itself"""
+    return getattr(_local, "depth", 0) > 0
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        # default burst is 100ms worth of requests, so bursts stay under the limit
+        self.capacity = float(burst or max(1, rate / 10))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_for)
+
+
+class Checkpoint:
+    """append-only file of finished task keys"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, key):
+        return str(key) in self.done
+
+    def mark(self, key):
+        with self.lock:
+            self.done.add(str(key))
+            self.file.write(f"{key}\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+@dataclass
+class SyncReport:
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    skipped: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    errors: dict = field(default_factory=dict)
+
+    @property
+    def rate(self):
+        return self.done / self.elapsed if self.elapsed else 0.0
+
+
+class SyncEngine:
+    def __init__(self, workers=8, rate=25, burst=None, max_retries=5,
+                 backoff_base=0.5, backoff_max=30, checkpoint=None, progress=None):
+        self.workers = workers
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.checkpoint = checkpoint
+        self.progress = progress
+        self.lock = threading.Lock()
+
+    def call(self, func, report):
+        """runs func under the rate limit, retrying 429s"""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            _local.depth = getattr(_local, "depth", 0) + 1
+            try:
+                return func()
+            except stripe.error.RateLimitError:
+                if attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                attempt += 1
+                with self.lock:
+                    report.retries += 1
+                logger.debug(f"Rate limited by Stripe, retrying in {delay:.2f}s")
+                time.sleep(delay)
+            finally:
+                _local.depth -= 1
+
+    def run(self, tasks):
+        """tasks: iterable of (key, callable). returns a SyncReport, errors keyed by task key"""
+        report = SyncReport()
+        started = time.monotonic()
+        last_progress = started
+        in_flight = {}
+
+        def report_progress():
+            nonlocal last_progress
+            now = time.monotonic()
+            if self.progress and now - last_progress >= 1:
+                report.elapsed = now - started
+                self.progress(report)
+                last_progress = now
+
+        def finish(future):
+            key = in_flight.pop(future)
+            error = future.exception()
+            if error is None:
+                report.done += 1
+                if self.checkpoint is not None:
+                    self.checkpoint.mark(key)
+            else:
+                report.failed += 1
+                report.errors[key] = error
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for key, func in tasks:
+                report.total += 1
+                if self.checkpoint is not None and key in self.checkpoint:
+                    report.skipped += 1
+                    continue
+
+                # keep the queue short so huge task streams are never materialized
+                while len(in_flight) >= self.workers * 2:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        finish(future)
+                    report_progress()
+
+                in_flight[pool.submit(self.call, func, report)] = key
+
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    finish(future)
+                report_progress()
+
+        report.elapsed = time.monotonic() - started
+        if self.progress:
+            self.progress(report)
+        return report
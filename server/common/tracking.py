@@ -0,0 +1,79 @@
+"""
+Lazy dirty-field tracking for models.
+
+Tracked fields get a data descriptor that records a field's original value the
+first time it is re-assigned on a loaded instance. Nothing is stored on load,
+so instantiating rows (list pages, select_related, bulk_update) costs the same
+as an untracked model.
+"""
+from django.db.models.query_utils import DeferredAttribute
+
+ORIGINALS_ATTR = "_dirty_originals"
+
+# original of a field that was deferred when the row was loaded: the old value
+# is unknown, so any assignment counts as a change
+_DEFERRED = object()
+
+
+class DirtyTrackingAttribute(DeferredAttribute):
+    def __set__(self, instance, value):
+        data = instance.__dict__
+        name = self.field.attname
+
+        # the first assignment is the value coming from __init__/the db;
+        # from_db() only sets _state.db once __init__ is done, so a missing
+        # value on a loaded row means the field was deferred
+        if name in data:
+            original = data[name]
+        elif instance._state.db is not None:
+            original = _DEFERRED
+        else:
+            data[name] = value
+            return
+
+        originals = data.get(ORIGINALS_ATTR)
+        if originals is None:
+            originals = data[ORIGINALS_ATTR] = {}
+        originals.setdefault(name, original)
+
+        data[name] = value
+
+
+def track_changes(*field_names):
+    """class decorator: `@track_changes("name", "price")` on a DirtyFieldsMixin model"""
+    def decorator(cls):
+        for name in field_names:
+            field = cls._meta.get_field(name)
+            setattr(cls, field.attname, DirtyTrackingAttribute(field))
+        return cls
+    return decorator
+
+
+class DirtyFieldsMixin:
+    def get_dirty_fields(self):
+        """returns {attname: new value} for tracked fields whose value really changed"""
+        originals = self.__dict__.get(ORIGINALS_ATTR)
+        if not originals:
+            return {}
+
+        return {
+            name: self.__dict__[name]
+            for name, old in originals.items()
+            if self.__dict__[name] != old
+        }
+
+    def reset_dirty_fields(self):
+        self.__dict__.pop(ORIGINALS_ATTR, None)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self.reset_dirty_fields()
+            return
+
+        # reading a deferred field refreshes just that field, the changes
+        # pending on the others still have to be saved
+        originals = self.__dict__.get(ORIGINALS_ATTR)
+        if originals:
+            for name in fields:
+                originals.pop(self._meta.get_field(name).attname, None)
@@ -1,4 +1,27 @@
 from django.contrib import admin
-from .models import Coupon
+from .campaigns import start_campaign
+from .models import Coupon, CouponCampaign, PromotionSlot
 
-admin.site.register(Coupon)
\ No newline at end of file
+admin.site.register(Coupon)
+
+
+@admin.register(CouponCampaign)
+class CouponCampaignAdmin(admin.ModelAdmin):
+    list_display = ("name", "prefix", "quantity", "generated", "synced", "sync_failed", "status", "created_at")
+    list_filter = ("status",)
+    search_fields = ("name", "prefix")
+    readonly_fields = ["generated", "synced", "sync_failed", "status", "last_error", "finished_at"]
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        if not change:
+            start_campaign(obj)
+
+
+@admin.register(PromotionSlot)
+class PromotionSlotAdmin(admin.ModelAdmin):
+    list_display = ("slot_number", "claimed_by", "claimed_at")
+    search_fields = ("slot_number",)
+    readonly_fields = ["slot_number", "claimed_by", "claimed_at"]
@@ -5,4 +5,9 @@ class CouponsConfig(AppConfig):
     name = 'coupons'
 
     def ready(self):
-        import coupons.signals
\ No newline at end of file
+        import coupons.signals
+
+        from django.conf import settings
+        if settings.COUPON_SWEEP_IN_PROCESS:
+            from coupons.sweeper import sweeper
+            sweeper.ensure_started()
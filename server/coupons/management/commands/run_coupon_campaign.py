@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from coupons.campaigns import run_campaign
+from coupons.models import CouponCampaign
+from products.stripe_sync import add_engine_arguments, engine_from_options
+
+
+class Command(BaseCommand):
+    help = 'Generates and syncs coupon campaigns, resuming where an earlier run stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('campaign_ids', nargs='*', type=int)
+        parser.add_argument('--unfinished', action='store_true', help='Every campaign that is not DONE')
+        add_engine_arguments(parser)
+
+    def handle(self, *args, **options):
+        campaigns = CouponCampaign.objects.order_by('id')
+        if options['unfinished']:
+            campaigns = campaigns.exclude(status=CouponCampaign.DONE)
+        elif options['campaign_ids']:
+            campaigns = campaigns.filter(id__in=options['campaign_ids'])
+        else:
+            raise CommandError('Give campaign ids or --unfinished')
+
+        for campaign in campaigns:
+            self.stdout.write(f"Campaign {campaign.id} ({campaign}): {campaign.quantity} codes...")
+            try:
+                campaign = run_campaign(campaign.id, engine=engine_from_options(options, self.stdout.write))
+            except Exception as e:
+                self.stderr.write(self.style.ERROR(f"Campaign {campaign.id} failed: {e}"))
+                continue
+
+            campaign.refresh_from_db()
+            style = self.style.SUCCESS if campaign.status == CouponCampaign.DONE else self.style.WARNING
+            self.stdout.write(style(
+                f"Campaign {campaign.id}: {campaign.status}, {campaign.generated} generated, "
+                f"{campaign.synced} synced, {campaign.sync_failed} failed"
+            ))
@@ -0,0 +1,30 @@
+import time
+from django.core.management.base import BaseCommand
+from common.sync_engine import SyncEngine
+from coupons.sweeper import BATCH_SIZE, sweep
+from django.conf import settings
+
+
+class Command(BaseCommand):
+    help = 'Deactivates expired, unused coupon reservations and deletes their Stripe coupons'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--rate', type=float, default=settings.COUPON_SWEEP_STRIPE_RATE,
+                            help='Max Stripe deletes per second')
+
+    def handle(self, *args, **options):
+        engine = SyncEngine(workers=2, rate=options['rate'])
+        try:
+            while True:
+                deactivated, deleted, failed = sweep(engine=engine, batch_size=options['batch_size'])
+                self.stdout.write(
+                    f"Deactivated {deactivated} expired coupons, deleted {deleted} Stripe coupons, {failed} failed"
+                )
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:14
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coupons', '0004_promotionslot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='coupon',
+            name='reserved_by_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reserved_coupons', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='coupon',
+            name='slot_number',
+            field=models.PositiveIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.CreateModel(
+            name='CouponCampaign',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('prefix', models.CharField(max_length=6, unique=True)),
+                ('discount_percentage', models.PositiveIntegerField(default=10)),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('GENERATING', 'Generating'), ('SYNCING', 'Syncing to Stripe'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=12)),
+                ('generated', models.PositiveIntegerField(default=0)),
+                ('synced', models.PositiveIntegerField(default=0)),
+                ('sync_failed', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='coupon_campaigns', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='coupon',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='coupons', to='coupons.couponcampaign'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coupons', '0005_couponcampaign'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_used', False)), fields=['expires_at'], name='coupon_reserved_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(condition=models.Q(('is_active', False), ('is_used', False), ('stripe_coupon_id__isnull', False)), fields=['expires_at'], name='coupon_stripe_cleanup_idx'),
+        ),
+    ]
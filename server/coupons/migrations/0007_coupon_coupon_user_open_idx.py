@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coupons', '0006_coupon_sweeper_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coupon',
+            index=models.Index(fields=['reserved_by_user', 'is_used', 'expires_at'], name='coupon_user_open_idx'),
+        ),
+    ]
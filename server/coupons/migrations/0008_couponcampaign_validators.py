@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:38
+
+import coupons.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coupons', '0007_coupon_coupon_user_open_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='couponcampaign',
+            name='discount_percentage',
+            field=models.PositiveIntegerField(default=10, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AlterField(
+            model_name='couponcampaign',
+            name='prefix',
+            field=models.CharField(error_messages={'unique': 'This prefix is already in use.'}, max_length=6, unique=True, validators=[django.core.validators.RegexValidator('^[A-Z0-9]{2,6}$', '2-6 upper case letters or digits.'), coupons.models.validate_campaign_prefix]),
+        ),
+        migrations.AlterField(
+            model_name='couponcampaign',
+            name='quantity',
+            field=models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(100000)]),
+        ),
+    ]
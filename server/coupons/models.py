@@ -1,9 +1,79 @@
 from email.policy import default
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
 from django.utils import timezone
 from common.models import BaseModel
 
+# the nth-order coupons are LUCKY-<slot>-XXXX, see coupons/views.py
+LUCKY_PREFIX = "LUCKY"
+MAX_CAMPAIGN_SIZE = 100_000
+
+
+def validate_campaign_prefix(value):
+    if value == LUCKY_PREFIX:
+        raise ValidationError("This prefix is reserved for the nth-order coupons.")
+
+class CouponCampaign(BaseModel):
+    """a batch of single-use codes generated in bulk by an admin, see coupons/campaigns.py"""
+
+    PENDING = "PENDING"
+    GENERATING = "GENERATING"
+    SYNCING = "SYNCING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (GENERATING, "Generating"),
+        (SYNCING, "Syncing to Stripe"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    # every code of the campaign starts with it, unique so codes can't collide across campaigns
+    prefix = models.CharField(
+        max_length=6,
+        unique=True,
+        error_messages={"unique": "This prefix is already in use."},
+        validators=[
+            RegexValidator(r"^[A-Z0-9]{2,6}$", "2-6 upper case letters or digits."),
+            validate_campaign_prefix,
+        ],
+    )
+    discount_percentage = models.PositiveIntegerField(
+        default=10, validators=[MinValueValidator(1), MaxValueValidator(100)]
+    )
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(MAX_CAMPAIGN_SIZE)])
+    expires_at = models.DateTimeField()
+
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=PENDING)
+    # progress, updated after every chunk
+    generated = models.PositiveIntegerField(default=0)
+    synced = models.PositiveIntegerField(default=0)
+    sync_failed = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='coupon_campaigns'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def clean(self):
+        # the admin form and the API both end up here
+        if self._state.adding and self.expires_at and self.expires_at <= timezone.now():
+            raise ValidationError({"expires_at": "Must be in the future."})
+
+    def __str__(self):
+        return f"{self.name} ({self.prefix})"
+
+
 class Coupon(BaseModel):
     code = models.CharField(max_length=15, unique=True)
     discount_percentage = models.PositiveIntegerField(default=10)
@@ -17,18 +87,93 @@ class Coupon(BaseModel):
     reserved_at = models.DateTimeField(auto_now_add=True)
     
     # Critical for preventing race conditions
-    slot_number = models.PositiveIntegerField(unique=True) 
+    # empty for campaign coupons, which don't belong to an nth-order slot
+    slot_number = models.PositiveIntegerField(unique=True, null=True, blank=True)
 
+    # empty for campaign coupons, which anyone holding the code can use once
     reserved_by_user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name='reserved_coupons'
     )
 
+    campaign = models.ForeignKey(
+        CouponCampaign,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='coupons'
+    )
+
+    class Meta:
+        indexes = [
+            # the sweeper's "expired but still reserved" scan, rows leave it once deactivated
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(is_used=False, is_active=True),
+                name="coupon_reserved_expiry_idx",
+            ),
+            # swept coupons whose Stripe copy still has to be deleted, rows leave it once it is
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(is_used=False, is_active=False, stripe_coupon_id__isnull=False),
+                name="coupon_stripe_cleanup_idx",
+            ),
+            # a customer's unused coupons that haven't expired yet
+            models.Index(fields=["reserved_by_user", "is_used", "expires_at"], name="coupon_user_open_idx"),
+        ]
+
     def is_valid_for_user(self, user):
         now = timezone.now()
         if self.is_used: return False
         if not self.is_active: return False
         if now > self.expires_at: return False
-        if self.reserved_by_user != user: return False
-        return True
\ No newline at end of file
+        if self.reserved_by_user_id is not None and self.reserved_by_user != user: return False
+        return True
+
+
+class PromotionSlotManager(models.Manager):
+    def claim(self, slot_number, user):
+        """claims a winning slot with one conditional UPDATE, True for the one caller that got it
+
+        Losers are not queued behind a lock: the UPDATE matches nothing once
+        claimed_by is set and they return straight away.
+        """
+        if self._claim(slot_number, user):
+            return True
+        if self.filter(slot_number=slot_number).exists():
+            return False
+        # first caller for this slot, create the row (a racing creator is ignored) and claim it
+        self.bulk_create([PromotionSlot(slot_number=slot_number)], ignore_conflicts=True)
+        return self._claim(slot_number, user)
+
+    def _claim(self, slot_number, user):
+        return bool(
+            self.filter(slot_number=slot_number, claimed_by__isnull=True)
+            .update(claimed_by=user, claimed_at=timezone.now())
+        )
+
+    def release(self, *slot_numbers):
+        """makes slots claimable again, e.g. when their coupon expired unused"""
+        return self.filter(slot_number__in=slot_numbers).update(claimed_by=None, claimed_at=None)
+
+class PromotionSlot(BaseModel):
+    """one row per winning nth-order slot, whoever flips claimed_by gets the coupon"""
+    slot_number = models.PositiveIntegerField(unique=True)
+
+    claimed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='promotion_slots'
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PromotionSlotManager()
+
+    def __str__(self):
+        return f"Slot {self.slot_number}"
@@ -0,0 +1,20 @@
+from rest_framework import serializers
+from .models import CouponCampaign
+
+
+class CouponCampaignSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CouponCampaign
+        fields = [
+            "id", "name", "prefix", "discount_percentage", "quantity", "expires_at",
+            "status", "generated", "synced", "sync_failed", "progress", "last_error",
+            "created_at", "finished_at",
+        ]
+
+    def get_progress(self, campaign) -> float:
+        """share of the work done, generating and syncing weigh the same"""
+        if not campaign.quantity:
+            return 1.0
+        return round((campaign.generated + campaign.synced) / (2 * campaign.quantity), 4)
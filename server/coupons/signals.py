@@ -2,7 +2,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import Coupon
-import stripe
+from common.stripe_client import get_stripe_client
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,12 +12,13 @@ def create_stripe_coupon(sender, instance, created, **kwargs):
     """
     Triggers automatically AFTER a Coupon is saved to the DB.
     """
-    if created and not instance.stripe_coupon_id:
+    # campaign coupons are bulk created and synced in batches by coupons/campaigns.py
+    if created and not instance.stripe_coupon_id and instance.campaign_id is None:
         try:
             logger.info(f"Syncing coupon {instance.code} to Stripe...")
             
             # Create the Coupon in Stripe
-            stripe_coupon = stripe.Coupon.create(
+            stripe_coupon = get_stripe_client().create_coupon(
                 name=instance.code,
                 percent_off=instance.discount_percentage,
                 duration="once", 
@@ -0,0 +1,152 @@
+"""
+Reclaims expired, unused coupon reservations.
+
+A LUCKY- coupon is reserved for 10 minutes; if it isn't spent by then its
+row, its slot_number and its Stripe coupon used to stay forever. `sweep()`:
+
+1. deactivate: claims expired coupons that are still active and unused a
+   batch at a time (through the partial index coupon_reserved_expiry_idx,
+   skipping rows a checkout has locked) and, in the same transaction, sets
+   them inactive, frees their slot_number and releases their PromotionSlot
+   so the slot can be won again
+2. Stripe cleanup: deletes the Stripe coupons of swept rows through a
+   SyncEngine with its own small rate budget, so cleanup never competes with
+   checkout for Stripe's rate limit, and clears stripe_coupon_id on success.
+   What fails stays in coupon_stripe_cleanup_idx for the next sweep.
+
+It runs from `manage.py sweep_coupons --loop`, or, with
+COUPON_SWEEP_IN_PROCESS, on a thread of every process (`sweeper`, started by
+CouponsConfig.ready) every COUPON_SWEEP_INTERVAL seconds.
+"""
+import logging
+import threading
+import time
+from functools import partial
+
+import stripe
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from common.stripe_client import get_stripe_client
+from common.sync_engine import SyncEngine
+from .models import Coupon, PromotionSlot
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def deactivate_batch(now, batch_size):
+    """returns the coupons it deactivated"""
+    with transaction.atomic():
+        rows = list(
+            Coupon.objects.select_for_update(skip_locked=True)
+            .filter(is_used=False, is_active=True, expires_at__lt=now)
+            .order_by("expires_at")
+            .values("id", "slot_number")[:batch_size]
+        )
+        if rows:
+            Coupon.objects.filter(id__in=[row["id"] for row in rows]).update(is_active=False, slot_number=None)
+            slots = [row["slot_number"] for row in rows if row["slot_number"] is not None]
+            if slots:
+                PromotionSlot.objects.release(*slots)
+    return rows
+
+
+def deactivate_expired(now=None, batch_size=BATCH_SIZE):
+    now = now or timezone.now()
+    total = 0
+    while True:
+        rows = deactivate_batch(now, batch_size)
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+
+
+def delete_stripe_coupon(client, stripe_coupon_id):
+    """runs on a SyncEngine worker"""
+    try:
+        client.delete_coupon(stripe_coupon_id)
+    except stripe.error.InvalidRequestError as e:
+        # already gone is what we wanted
+        if e.http_status != 404:
+            raise
+
+
+def default_engine():
+    return SyncEngine(workers=2, rate=settings.COUPON_SWEEP_STRIPE_RATE)
+
+
+def delete_from_stripe(now=None, client=None, engine=None, batch_size=BATCH_SIZE):
+    """returns (deleted, failed)"""
+    now = now or timezone.now()
+    client = client or get_stripe_client()
+    engine = engine or default_engine()
+    deleted = failed = 0
+
+    while True:
+        rows = list(
+            Coupon.objects.filter(is_used=False, is_active=False, stripe_coupon_id__isnull=False, expires_at__lt=now)
+            .order_by("expires_at")
+            .values_list("id", "stripe_coupon_id")[:batch_size]
+        )
+        if not rows:
+            break
+
+        report = engine.run(
+            (coupon_id, partial(delete_stripe_coupon, client, stripe_id)) for coupon_id, stripe_id in rows
+        )
+        done = [coupon_id for coupon_id, _ in rows if coupon_id not in report.errors]
+        if done:
+            # a coupon reactivated meanwhile keeps its Stripe id
+            Coupon.objects.filter(id__in=done, is_active=False).update(stripe_coupon_id=None)
+
+        deleted += len(done)
+        failed += len(report.errors)
+        for coupon_id, error in report.errors.items():
+            logger.warning(f"Could not delete the Stripe coupon of coupon {coupon_id}: {error}")
+        if not done:
+            # Stripe is failing, leave the rest for the next sweep
+            break
+
+    return deleted, failed
+
+
+def sweep(client=None, engine=None, batch_size=BATCH_SIZE):
+    """returns (deactivated, deleted on Stripe, failed on Stripe)"""
+    now = timezone.now()
+    deactivated = deactivate_expired(now, batch_size)
+    deleted, failed = delete_from_stripe(now, client, engine, batch_size)
+    if deactivated or deleted or failed:
+        logger.info(f"Coupon sweep: {deactivated} deactivated, {deleted} deleted on Stripe, {failed} failed")
+    return deactivated, deleted, failed
+
+
+class CouponSweeper:
+    """sweeps every COUPON_SWEEP_INTERVAL seconds on a background thread, started by `ensure_started()`"""
+
+    def __init__(self):
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.thread is None and settings.COUPON_SWEEP_INTERVAL:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, name="coupon-sweeper", daemon=True)
+                    self.thread.start()
+
+    def run(self):
+        while True:
+            # the first sweep waits too, so nothing is queried while the app starts
+            time.sleep(settings.COUPON_SWEEP_INTERVAL)
+            try:
+                sweep()
+            except Exception as e:
+                logger.exception(f"Coupon sweep failed: {e}")
+            finally:
+                close_old_connections()
+
+
+sweeper = CouponSweeper()
@@ -1,3 +1,98 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from common.stripe_client import FakeStripeClient, set_stripe_client
+from store import counters
+from store.cache import get_setting
+from store.models import GlobalOrderCounter, StoreSettings
+from .models import Coupon, PromotionSlot
+
+User = get_user_model()
+
+
+class GenerateCouponStressTests(TransactionTestCase):
+    """hundreds of users asking for the same winning slot at the same moment"""
+
+    CALLERS = 200
+    NTH = 5
+
+    def setUp(self):
+        self.previous_client = set_stripe_client(FakeStripeClient())
+        self.addCleanup(set_stripe_client, self.previous_client)
+
+        StoreSettings.objects.create(key="nth_order", value=self.NTH, is_active=True)
+        # the next paid order is the winning one
+        GlobalOrderCounter.objects.create(id=counters.ORDER_COUNTER, current_count=self.NTH - 1)
+        self.users = User.objects.bulk_create(
+            User(email=f"rush{i}@example.com") for i in range(self.CALLERS)
+        )
+
+    def rush(self):
+        barrier = threading.Barrier(self.CALLERS)
+        responses = []
+        lock = threading.Lock()
+
+        def call(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                response = client.post("/api/v1/coupons/generate/")
+                with lock:
+                    responses.append(response)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=call, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_exactly_one_caller_wins_the_slot(self):
+        responses = self.rush()
+
+        self.assertEqual(len(responses), self.CALLERS)
+        self.assertEqual(sorted({r.status_code for r in responses}), [200, 201])
+        winners = [r for r in responses if r.status_code == 201]
+        self.assertEqual(len(winners), 1)
+
+        coupon = Coupon.objects.get()
+        self.assertEqual(coupon.code, winners[0].data["coupon_code"])
+        self.assertEqual(coupon.slot_number, self.NTH)
+        slot = PromotionSlot.objects.get()
+        self.assertEqual(slot.claimed_by_id, coupon.reserved_by_user_id)
+
+    def test_next_slot_opens_after_enough_orders(self):
+        self.rush()
+        for _ in range(self.NTH):
+            counters.increment()
+
+        responses = self.rush()
+
+        self.assertEqual(sum(r.status_code == 201 for r in responses), 1)
+        self.assertEqual(
+            sorted(Coupon.objects.values_list("slot_number", flat=True)), [self.NTH, 2 * self.NTH]
+        )
+
+
+class StoreSettingCacheTests(TestCase):
+    def test_changes_invalidate_the_cached_value(self):
+        self.assertIsNone(get_setting("nth_order"))
+
+        setting = StoreSettings.objects.create(key="nth_order", value=5)
+        self.assertEqual(get_setting("nth_order"), 5)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_setting("nth_order"), 5)
+
+        setting.value = 7
+        setting.save()
+        self.assertEqual(get_setting("nth_order"), 7)
+
+        setting.delete()
+        self.assertIsNone(get_setting("nth_order"))
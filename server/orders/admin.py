@@ -1,11 +1,12 @@
 from django.contrib import admin
-from .models import Order, OrderItem, Cart, CartItem
+from .models import Order, OrderItem, Cart, CartItem, StripeEvent
 
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    readonly_fields = ('product', 'quantity', 'price_at_purchase_time')
+    fields = ('product_name', 'product_thumbnail_url', 'quantity', 'price_at_purchase_time')
+    readonly_fields = fields
 
 
 @admin.register(Order)
@@ -28,12 +29,11 @@ class OrderAdmin(admin.ModelAdmin):
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = (
         'order',
-        'product',
+        'product_name',
         'quantity',
         'price_at_purchase_time',
     )
-    search_fields = ('order__id', 'product__name')
-    list_filter = ('product',)
+    search_fields = ('order__id', 'product_name')
 
 
 class CartItemInline(admin.TabularInline):
@@ -51,4 +51,11 @@ class CartAdmin(admin.ModelAdmin):
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('cart', 'product', 'quantity')
-    search_fields = ('cart__owner__email', 'product__name')
\ No newline at end of file
+    search_fields = ('cart__owner__email', 'product__name')
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'type', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status', 'type')
+    search_fields = ('event_id',)
+    readonly_fields = ('event_id', 'type', 'payload', 'received_at', 'processed_at')
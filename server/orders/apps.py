@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        from django.conf import settings
+        if settings.STRIPE_EVENTS_IN_PROCESS:
+            from orders.webhooks import dispatcher
+            dispatcher.ensure_started()
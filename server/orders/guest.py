@@ -0,0 +1,111 @@
+"""
+Carts for anonymous shoppers.
+
+A guest cart lives in the key-value store (common/kv.py), not in the
+Cart/CartItem tables, under a random id. The client only ever sees that id
+signed, in the X-Cart-Token header, so ids can't be guessed or forged.
+Carts expire GUEST_CART_TTL seconds after their last change.
+
+On login the guest cart is folded into the user's Cart with one upsert
+(`merge_guest_cart`) and dropped from the store.
+"""
+import logging
+import uuid
+
+from django.conf import settings
+from django.core import signing
+
+from common.kv import get_kv_store
+from products.models import Product
+from .models import Cart, CartItem
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = "X-Cart-Token"
+SALT = "orders.guest-cart"
+
+
+def new_token():
+    return signing.dumps(uuid.uuid4().hex, salt=SALT, compress=True)
+
+
+def read_token(token):
+    """returns the cart id of a signed token, None for a missing or tampered one"""
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        return None
+
+
+def token_from_request(request):
+    return request.headers.get(TOKEN_HEADER)
+
+
+class GuestCart:
+    """{product_id: quantity} in the kv store"""
+
+    def __init__(self, token=None, store=None):
+        self.store = store or get_kv_store()
+        self.cart_id = read_token(token)
+        self.token = token if self.cart_id else None
+        self.quantities = {}
+
+        if self.cart_id:
+            data = self.store.get(self.key, {})
+            self.quantities = {int(pid): qty for pid, qty in data.get("items", {}).items()}
+
+    @property
+    def key(self):
+        return f"guest-cart:{self.cart_id}"
+
+    def add(self, product_id, quantity):
+        self.quantities[product_id] = self.quantities.get(product_id, 0) + quantity
+
+    def set(self, product_id, quantity):
+        self.quantities[product_id] = quantity
+
+    def remove(self, product_id):
+        self.quantities.pop(product_id, None)
+
+    def save(self):
+        """persists the cart, issuing a token on the first write"""
+        if self.cart_id is None:
+            self.token = new_token()
+            self.cart_id = read_token(self.token)
+
+        items = {str(pid): qty for pid, qty in self.quantities.items()}
+        self.store.set(self.key, {"items": items}, ttl=settings.GUEST_CART_TTL)
+
+    def clear(self):
+        if self.cart_id:
+            self.store.delete(self.key)
+        self.quantities = {}
+
+    def items(self):
+        """unsaved CartItems (id is None) with their products, one IN query"""
+        products = Product.objects.in_bulk(self.quantities)
+        return [
+            CartItem(product=products[pid], quantity=qty)
+            for pid, qty in self.quantities.items()
+            if pid in products
+        ]
+
+
+def merge_guest_cart(user, token):
+    """adds the guest cart's lines to the user's cart, returns how many lines were merged"""
+    guest = GuestCart(token)
+    if not guest.quantities:
+        return 0
+
+    # products deleted since they were added are dropped
+    existing = set(Product.objects.filter(id__in=guest.quantities).values_list("id", flat=True))
+    quantities = {pid: qty for pid, qty in guest.quantities.items() if pid in existing}
+
+    cart, _ = Cart.objects.get_or_create(owner=user)
+    CartItem.objects.add_quantities(cart.id, quantities)
+    guest.clear()
+
+    logger.info(f"Merged {len(quantities)} guest cart lines into cart {cart.id}")
+    return len(quantities)
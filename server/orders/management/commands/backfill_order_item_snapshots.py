@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from orders.models import Order, OrderItem
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Copies product name and thumbnail onto order items created before they were snapshotted at checkout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        product = Product.objects.filter(id=OuterRef("product_id"))
+        missing = OrderItem.objects.filter(product_name="").order_by("id")
+        total = last_id = 0
+
+        while True:
+            batch = list(missing.filter(id__gt=last_id).values_list("id", "order_id")[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            with transaction.atomic():
+                # one UPDATE per batch, the values are copied inside the database
+                OrderItem.objects.filter(id__in=[item_id for item_id, _ in batch]).update(
+                    product_name=Subquery(product.values("name")[:1]),
+                    product_thumbnail_url=Subquery(product.values("thumbnail_url")[:1]),
+                )
+                # the order history ETags go by Order.updated_at
+                Order.objects.filter(id__in={order_id for _, order_id in batch}).update(updated_at=timezone.now())
+
+            total += len(batch)
+            self.stdout.write(f"Backfilled {total} order items...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} order items backfilled."))
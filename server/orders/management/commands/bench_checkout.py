@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+
+from common.fake_stripe_server import FakeStripeServer, checkout_completed_event, sign_webhook
+from common.stripe_client import ResilientStripeClient, StripeClient, get_stripe_client, set_stripe_client
+from orders.models import Order
+from orders.webhooks import process_pending
+from products.models import Product
+from store.models import StoreSettings
+
+WEBHOOK_SECRET = "whsec_bench"
+PASSWORD = "bench-password"
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, len(values) * p // 100)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-tests checkout end to end: N concurrent users log in, add to cart, try for a coupon, '
+        'check out and get a signed webhook, against a real HTTP server, a throwaway database '
+        'and the fake Stripe server'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Concurrent users')
+        parser.add_argument('--rounds', type=int, default=3, help='Checkouts per user')
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--nth', type=int, default=5, help='nth_order promotion setting')
+        parser.add_argument('--stripe-latency', type=float, default=0.05, help='Seconds per fake Stripe request')
+        parser.add_argument('--stripe-error-rate', type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        if options['verbosity'] < 2:
+            # the dev settings log everything at DEBUG, which would skew the numbers
+            logging.getLogger().setLevel(logging.WARNING)
+        os.environ["STRIPE_WEBHOOK_SECRET"] = WEBHOOK_SECRET
+
+        # a throwaway database; a file, not :memory:, so every server thread sees it
+        if connection.vendor == "sqlite":
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tempfile.mkdtemp(), "bench_checkout.sqlite3")
+            connection.settings_dict["OPTIONS"].setdefault("timeout", 30)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        stripe_server = FakeStripeServer(
+            latency=options['stripe_latency'], error_rate=options['stripe_error_rate']
+        ).start()
+        previous_client = set_stripe_client(
+            ResilientStripeClient(StripeClient(api_key="sk_test_bench", api_base=stripe_server.url))
+        )
+
+        httpd = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler, allow_reuse_address=True)
+        httpd.set_app(WSGIHandler())
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{httpd.server_address[1]}/api/v1"
+
+        try:
+            product_ids = [
+                product.id for product in Product.objects.bulk_create(
+                    Product(name=f"Bench product {i}", price=f"{random.randint(100, 5000) / 100:.2f}")
+                    for i in range(options['products'])
+                )
+            ]
+            StoreSettings.objects.create(key="nth_order", value=options['nth'], is_active=True)
+            connection.close()
+
+            self.run_load(base_url, stripe_server, product_ids, options)
+
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            stripe_server.stop()
+            set_stripe_client(previous_client)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_load(self, base_url, stripe_server, product_ids, options):
+        timings = defaultdict(list)
+        failures = defaultdict(int)
+        lock = threading.Lock()
+
+        def timed(session, endpoint, method, path, **kwargs):
+            started = time.perf_counter()
+            try:
+                response = session.request(method, f"{base_url}{path}", timeout=60, **kwargs)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                response, ok = None, False
+            elapsed = time.perf_counter() - started
+
+            with lock:
+                timings[endpoint].append(elapsed)
+                if not ok:
+                    failures[endpoint] += 1
+            return response if ok else None
+
+        def user_flow(index):
+            session = requests.Session()
+            response = timed(session, "login", "POST", "/auth/login/", json={
+                "email": f"bench{index}@example.com", "password": PASSWORD,
+            })
+            if response is None:
+                return 0
+            session.headers["Authorization"] = f"Bearer {response.json()['tokens']['access']}"
+
+            completed = 0
+            for _ in range(options['rounds']):
+                if timed(session, "add_to_cart", "POST", "/cart/", json={
+                    "product_id": random.choice(product_ids), "quantity": random.randint(1, 3),
+                }) is None:
+                    continue
+
+                coupon_code = None
+                response = timed(session, "generate_coupon", "POST", "/coupons/generate/")
+                if response is not None and response.status_code == 201:
+                    coupon_code = response.json()["coupon_code"]
+
+                response = timed(session, "checkout", "POST", "/checkout/", json={"coupon_code": coupon_code})
+                if response is None:
+                    continue
+
+                # what Stripe would send once the customer paid
+                session_id = response.json()["checkout_url"].rsplit("/", 1)[-1]
+                event = checkout_completed_event(stripe_server.objects["checkout/sessions"][session_id])
+                payload = json.dumps(event)
+                if timed(session, "webhook", "POST", "/stripe/webhook", data=payload, headers={
+                    "Content-Type": "application/json",
+                    "Stripe-Signature": sign_webhook(payload, WEBHOOK_SECRET),
+                }) is not None:
+                    completed += 1
+            return completed
+
+        self.stdout.write(
+            f"{options['users']} users x {options['rounds']} checkouts, "
+            f"Stripe latency {options['stripe_latency'] * 1000:.0f}ms, error rate {options['stripe_error_rate']:.0%}"
+        )
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['users']) as pool:
+            completed = sum(pool.map(user_flow, range(options['users'])))
+        wall = time.perf_counter() - started
+
+        self.stdout.write(f"\n{'endpoint':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+        for endpoint in ("login", "add_to_cart", "generate_coupon", "checkout", "webhook"):
+            values = sorted(timings[endpoint])
+            self.stdout.write(
+                f"{endpoint:<16}{len(values):>7}{failures[endpoint]:>8}"
+                f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+                f"{percentile(values, 99) * 1000:>10.1f}{len(values) / wall:>9.1f}"
+            )
+
+        # webhooks are processed in the background, let the stragglers finish
+        process_pending()
+        paid = Order.objects.filter(status="PAID").count()
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{completed} checkouts completed in {wall:.2f}s ({completed / wall:.1f}/s), {paid} orders PAID"
+        ))
+
+        self.stdout.write("\nStripe client (server side):")
+        for operation, stats in get_stripe_client().metrics.snapshot().items():
+            self.stdout.write(f"  {operation}: {stats}")
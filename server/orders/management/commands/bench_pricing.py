@@ -0,0 +1,56 @@
+import random
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from products.models import Product
+from orders.pricing import build_quote
+
+
+def legacy_pricing(items, discount_percentage):
+    """what CheckoutView used to do: three passes of Decimal math"""
+    total_cost = sum(item.product.price * item.quantity for item in items)
+    discount_amount = (Decimal(discount_percentage) / 100) * total_cost
+    final_amount = total_cost - discount_amount
+    snapshots = [(item.product, item.quantity, item.product.price) for item in items]
+    line_items = [
+        {'price_data': {'currency': 'usd', 'unit_amount': int(item.product.price * 100)}, 'quantity': item.quantity}
+        for item in items
+    ]
+    return final_amount, snapshots, line_items
+
+
+def quote_pricing(items, discount_percentage):
+    quote = build_quote(items, discount_percentage)
+    snapshots = [(line.product, line.quantity, line.unit_price) for line in quote.lines]
+    line_items = [
+        {'price_data': {'currency': 'usd', 'unit_amount': line.unit_amount}, 'quantity': line.quantity}
+        for line in quote.lines
+    ]
+    return quote.total, snapshots, line_items
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmarks cart pricing (no database): legacy Decimal passes vs build_quote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=500)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        items = [
+            SimpleNamespace(
+                product=Product(id=i, name=f"p{i}", price=Decimal(rng.randint(100, 100_000)) / 100),
+                quantity=rng.randint(1, 20),
+            )
+            for i in range(options['lines'])
+        ]
+
+        for name, func in (("legacy", legacy_pricing), ("quote", quote_pricing)):
+            func(items, 15)  # warm up
+            started = time.perf_counter()
+            for _ in range(options['iterations']):
+                func(items, 15)
+            per_call = (time.perf_counter() - started) / options['iterations'] * 1000
+            self.stdout.write(f"{name:>7}: {per_call:.3f} ms per {options['lines']} line cart")
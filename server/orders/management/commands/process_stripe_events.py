@@ -0,0 +1,36 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from orders.webhooks import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Processes stored Stripe webhook events (not needed with STRIPE_EVENTS_IN_PROCESS=1)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process what is due and exit')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=8)
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when idle')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Processing Stripe events with {options['workers']} workers...")
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            try:
+                while True:
+                    done, failed = process_pending(
+                        pool, batch_size=options['batch_size'], max_attempts=options['max_attempts']
+                    )
+                    if done or failed:
+                        self.stdout.write(f"Processed {done}, failed {failed}")
+
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(self.style.SUCCESS("Stripe event processing stopped."))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from orders.models import StripeEvent
+from orders.webhooks import process_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-queues stored Stripe events and processes them again. Handlers are idempotent '
+        '(an order only goes from PENDING to PAID once), so replaying is safe'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', help='Stripe event ids (evt_...)')
+        parser.add_argument('--failed', action='store_true', help='All FAILED events')
+        parser.add_argument('--type', help='Only events of this type')
+        parser.add_argument('--since', help='Only events received after this ISO datetime')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        events = StripeEvent.objects.all()
+
+        if options['event_ids']:
+            events = events.filter(event_id__in=options['event_ids'])
+        elif options['failed']:
+            events = events.filter(status=StripeEvent.FAILED)
+        elif not (options['type'] or options['since']):
+            raise CommandError("Pass event ids, --failed, --type or --since")
+
+        if options['type']:
+            events = events.filter(type=options['type'])
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Not a datetime: {options['since']}")
+            events = events.filter(received_at__gte=since)
+
+        count = events.count()
+        if options['dry_run']:
+            self.stdout.write(f"Would replay {count} events.")
+            return
+
+        events.update(status=StripeEvent.PENDING, attempts=0, available_at=timezone.now(), last_error="")
+        done, failed = process_pending()
+        self.stdout.write(self.style.SUCCESS(f"Replayed {count} events: {done} processed, {failed} failed."))
@@ -1,5 +1,10 @@
-from django.db import models
+import uuid
+from decimal import Decimal
+from django.db import connections, models
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 from products.models import Product
 from coupons.models import Coupon
 from common.models import BaseModel
@@ -31,9 +36,20 @@ class Order(BaseModel):
         related_name='used_in_orders'
     )
 
+    # set once the Stripe Checkout session exists, see CheckoutView
+    stripe_session_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # a customer's order history, newest first (OrderViewSet)
+            models.Index(fields=["user", "-created_at"], name="order_user_created_idx"),
+            # the admin status filter and anything sweeping stale PENDING orders
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ]
+
 class OrderItem(BaseModel):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
@@ -42,8 +58,14 @@ class OrderItem(BaseModel):
     #helps in knowing at what price the product was purchased 
     price_at_purchase_time = models.DecimalField(max_digits=10, decimal_places=2)
 
+    # the product as it was at checkout, so order history never reads the
+    # products table and survives renames; older rows are filled in by
+    # `manage.py backfill_order_item_snapshots`
+    product_name = models.CharField(max_length=255, blank=True, default="")
+    product_thumbnail_url = models.URLField(null=True, blank=True)
+
     def __str__(self):
-        return f"{self.product.name}({self.quantity}) ordered for {self.price_at_purchase_time}"
+        return f"{self.product_name}({self.quantity}) ordered for {self.price_at_purchase_time}"
 
 class Cart(BaseModel):
     owner = models.OneToOneField(settings.AUTH_USER_MODEL, null=True, on_delete=models.CASCADE, related_name='cart')
@@ -53,11 +75,92 @@ class Cart(BaseModel):
     def __str__(self):
         return f"Cart for {self.owner.email}"
 
+class CartItemManager(models.Manager):
+    """single-statement upserts: INSERT ... ON CONFLICT (cart_id, product_id) DO UPDATE
+
+    the increment happens inside the database, so concurrent adds of the same
+    product never lose an update. works on SQLite (3.35+) and Postgres.
+    """
+
+    def _upsert_sql(self, connection, source):
+        qn = connection.ops.quote_name
+        table = qn(self.model._meta.db_table)
+        return (
+            f"INSERT INTO {table} ({qn('uuid')}, {qn('cart_id')}, {qn('product_id')}, {qn('quantity')}, {qn('updated_at')}) "
+            f"{source} "
+            f"ON CONFLICT ({qn('cart_id')}, {qn('product_id')}) DO UPDATE SET "
+            f"{qn('quantity')} = {table}.{qn('quantity')} + excluded.{qn('quantity')}, "
+            f"{qn('updated_at')} = excluded.{qn('updated_at')} "
+            f"RETURNING {qn('id')}, {qn('product_id')}, {qn('quantity')}"
+        )
+
+    def _prep(self, connection):
+        uuid_field = self.model._meta.get_field('uuid')
+        now = self.model._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+        return lambda: uuid_field.get_db_prep_value(uuid.uuid4(), connection), now
+
+    def add_to_owner_cart(self, owner_id, product_id, quantity):
+        """adds `quantity` of a product to the owner's cart in one statement
+
+        returns (cart_item_id, new_quantity), or None when the owner has no cart yet.
+        """
+        connection = connections[self.db]
+        new_uuid, now = self._prep(connection)
+        qn = connection.ops.quote_name
+
+        source = (
+            f"SELECT %s, {qn('id')}, %s, %s, %s FROM {qn(Cart._meta.db_table)} "
+            f"WHERE {qn('owner_id')} = %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(self._upsert_sql(connection, source), [new_uuid(), product_id, quantity, now, owner_id])
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        return row[0], row[2]
+
+    def totals(self, owner_id):
+        """line_count, item_count and subtotal of the owner's cart, one aggregate query"""
+        money = DecimalField(max_digits=12, decimal_places=2)
+        return self.filter(cart__owner_id=owner_id).aggregate(
+            line_count=Count('id'),
+            item_count=Coalesce(Sum('quantity'), 0),
+            subtotal=Coalesce(
+                Sum(F('quantity') * F('product__price'), output_field=money),
+                Decimal('0'),
+                output_field=money,
+            ),
+        )
+
+    def add_quantities(self, cart_id, quantities):
+        """adds {product_id: quantity} to a cart in one statement, returns [(id, product_id, quantity)]"""
+        if not quantities:
+            return []
+
+        connection = connections[self.db]
+        new_uuid, now = self._prep(connection)
+
+        params = []
+        for product_id, quantity in quantities.items():
+            params += [new_uuid(), cart_id, product_id, quantity, now]
+        source = "VALUES " + ", ".join(["(%s, %s, %s, %s, %s)"] * len(quantities))
+
+        with connection.cursor() as cursor:
+            cursor.execute(self._upsert_sql(connection, source), params)
+            return cursor.fetchall()
+
+
 class CartItem(BaseModel):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
 
+    # lets CartView answer conditional GETs without loading the cart
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CartItemManager()
+
     class Meta:
         # will help ensure that the one entry for a product per cart 
         # from next time would increment quantity instead of creating new record.
@@ -65,3 +168,37 @@ class CartItem(BaseModel):
 
 
 
+
+
+class StripeEvent(BaseModel):
+    """a verified Stripe webhook event, stored as received and processed later (see orders/webhooks.py)"""
+
+    PENDING = "PENDING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    # Stripe retries deliveries, the unique id turns every retry into a no-op
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="stripe_event_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
@@ -0,0 +1,104 @@
+"""
+Prices a cart once, in integer cents.
+
+`build_quote` walks the items a single time and returns a Quote that every
+consumer reads from: the cart totals, the Order / OrderItem snapshot and the
+Stripe line items (which take cents anyway). Prices are converted to cents
+with ROUND_HALF_UP, the coupon discount is rounded the same way, so the
+numbers stored on the order and the amounts sent to Stripe always agree.
+"""
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+
+# regulatory cap on a single checkout, in cents
+MAX_ORDER_AMOUNT = 25000_00
+
+def to_cents(amount):
+    scaled = Decimal(amount) * 100
+    cents = int(scaled)
+    if cents == scaled:
+        # prices are stored with two decimals, so this is the usual case
+        return cents
+    return int(scaled.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def percent_of(cents, percentage):
+    """percentage of an amount in cents, rounded half up"""
+    return (cents * percentage + 50) // 100
+
+
+class QuoteLine(NamedTuple):
+    # a tuple, cheap to build: a quote has one per cart line
+    product: object
+    quantity: int
+    unit_amount: int
+    amount: int
+    # unit_amount as a Decimal, for the OrderItem snapshot
+    unit_price: Decimal
+
+
+@dataclass(frozen=True)
+class Quote:
+    lines: tuple
+    item_count: int
+    subtotal_amount: int
+    discount_percentage: int
+    discount_amount: int
+    total_amount: int
+
+    @property
+    def subtotal(self):
+        return from_cents(self.subtotal_amount)
+
+    @property
+    def discount(self):
+        return from_cents(self.discount_amount)
+
+    @property
+    def total(self):
+        return from_cents(self.total_amount)
+
+    @property
+    def exceeds_limit(self):
+        return self.total_amount > MAX_ORDER_AMOUNT
+
+    def totals(self):
+        """the shape of CartItemManager.totals, for the cart summary serializers"""
+        return {
+            "line_count": len(self.lines),
+            "item_count": self.item_count,
+            "subtotal": self.subtotal,
+        }
+
+
+def build_quote(items, discount_percentage=0):
+    """items: anything with .product (with .price) and .quantity, e.g. CartItems"""
+    discount_percentage = max(0, min(100, int(discount_percentage or 0)))
+
+    lines = []
+    item_count = subtotal = 0
+    for item in items:
+        unit_amount = to_cents(item.product.price)
+        # the price actually charged, rounded when it had more than two decimals
+        unit_price = from_cents(unit_amount)
+
+        amount = unit_amount * item.quantity
+        lines.append(QuoteLine(item.product, item.quantity, unit_amount, amount, unit_price))
+        item_count += item.quantity
+        subtotal += amount
+
+    discount = percent_of(subtotal, discount_percentage)
+
+    return Quote(
+        lines=tuple(lines),
+        item_count=item_count,
+        subtotal_amount=subtotal,
+        discount_percentage=discount_percentage,
+        discount_amount=discount,
+        total_amount=subtotal - discount,
+    )
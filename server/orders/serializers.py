@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import CartItem, Order, OrderItem
+from products.models import Product
 from products.serializers import ProductSerializer
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -15,8 +16,45 @@ class CartItemSerializer(serializers.ModelSerializer):
         return obj.quantity * obj.product.price
 
 
+class CartProductSerializer(serializers.ModelSerializer):
+    """just what the cart UI renders"""
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'price', 'thumbnail_url']
+
+
+class CompactCartItemSerializer(serializers.ModelSerializer):
+    product = CartProductSerializer(read_only=True)
+    # annotated by the query, see CartView.get
+    subtotal = serializers.DecimalField(source='line_subtotal', max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['id', 'product', 'quantity', 'subtotal']
+
+
+class CartSummarySerializer(serializers.Serializer):
+    line_count = serializers.IntegerField()
+    item_count = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    # coupons are applied at checkout, so the cart total is the subtotal for now
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, source='subtotal')
+
+
+class CompactCartSerializer(CartSummarySerializer):
+    items = CompactCartItemSerializer(many=True)
+
+
+class OrderItemProductSerializer(serializers.Serializer):
+    """the product as it was at checkout, read from the snapshot on the order item"""
+    id = serializers.IntegerField(source='product_id')
+    name = serializers.CharField(source='product_name')
+    thumbnail_url = serializers.URLField(source='product_thumbnail_url', allow_null=True)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = OrderItemProductSerializer(source='*', read_only=True)
 
     class Meta:
         model = OrderItem
@@ -35,4 +73,16 @@ class OrderSerializer(serializers.ModelSerializer):
             'final_amount', 
             'created_at', 
             'items'
-        ]
\ No newline at end of file
+        ]
+
+
+class OrderListSerializer(OrderSerializer):
+    """the order history list, the order detail plus an item count"""
+    item_count = serializers.SerializerMethodField()
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields[:-1] + ['item_count', 'items']
+
+    def get_item_count(self, obj) -> int:
+        # items are prefetched, see OrderViewSet.get_queryset
+        return sum(item.quantity for item in obj.items.all())
@@ -1,3 +1,146 @@
-from django.test import TestCase
+import random
+from decimal import ROUND_HALF_UP, Decimal
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from products.models import Product
+from .models import Order, OrderItem
+from .pricing import MAX_ORDER_AMOUNT, build_quote, from_cents, to_cents
+
+
+def random_cart(rng, max_lines=40):
+    # prices get a third decimal place now and then, to exercise rounding
+    return [
+        SimpleNamespace(
+            product=Product(id=i, name=f"p{i}", price=Decimal(rng.randint(0, 2_000_000)) / rng.choice([100, 1000])),
+            quantity=rng.randint(1, 50),
+        )
+        for i in range(rng.randint(0, max_lines))
+    ]
+
+
+class BuildQuotePropertyTests(SimpleTestCase):
+    """properties of build_quote checked against plain Decimal math over random carts"""
+
+    CASES = 500
+
+    def carts(self):
+        rng = random.Random(1234)
+        for _ in range(self.CASES):
+            yield random_cart(rng), rng.randint(0, 100)
+
+    def test_lines_round_half_up_and_add_up(self):
+        for items, pct in self.carts():
+            quote = build_quote(items, pct)
+            for item, line in zip(items, quote.lines):
+                expected = (item.product.price * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+                self.assertEqual(line.unit_amount, int(expected))
+                self.assertEqual(line.amount, line.unit_amount * item.quantity)
+            self.assertEqual(quote.subtotal_amount, sum(line.amount for line in quote.lines))
+            self.assertEqual(quote.item_count, sum(item.quantity for item in items))
+
+    def test_discount_matches_decimal_reference(self):
+        for items, pct in self.carts():
+            quote = build_quote(items, pct)
+            expected = (Decimal(quote.subtotal_amount) * pct / 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+            self.assertEqual(quote.discount_amount, int(expected))
+            self.assertTrue(0 <= quote.discount_amount <= quote.subtotal_amount)
+            self.assertEqual(quote.total_amount, quote.subtotal_amount - quote.discount_amount)
+
+    def test_decimal_views_agree_with_cents(self):
+        for items, pct in self.carts():
+            quote = build_quote(items, pct)
+            self.assertEqual(quote.subtotal - quote.discount, quote.total)
+            self.assertEqual(to_cents(quote.total), quote.total_amount)
+
+    def test_limit(self):
+        for items, pct in self.carts():
+            quote = build_quote(items, pct)
+            self.assertEqual(quote.exceeds_limit, quote.total > from_cents(MAX_ORDER_AMOUNT))
+
+    def test_line_order_does_not_matter(self):
+        rng = random.Random(99)
+        for items, pct in self.carts():
+            shuffled = items[:]
+            rng.shuffle(shuffled)
+            a, b = build_quote(items, pct), build_quote(shuffled, pct)
+            self.assertEqual(
+                (a.subtotal_amount, a.discount_amount, a.total_amount),
+                (b.subtotal_amount, b.discount_amount, b.total_amount),
+            )
+
+    def test_edges(self):
+        self.assertEqual(build_quote([]).total_amount, 0)
+        item = SimpleNamespace(product=Product(price=Decimal("1.005")), quantity=1)
+        self.assertEqual(build_quote([item]).lines[0].unit_amount, 101)
+        self.assertEqual(build_quote([item], 150).total_amount, 0)
+        self.assertEqual(build_quote([item], -5).discount_amount, 0)
+
+
+class OrderHistoryQueryCountTests(TestCase):
+    """the order history costs the same number of queries for 1 order or a full page"""
+
+    ORDERS = 30
+    ITEMS_PER_ORDER = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email="history@example.com", password="x")
+        products = Product.objects.bulk_create(
+            Product(name=f"History product {i}", price=Decimal("9.99"), thumbnail_url=f"https://img.test/{i}.jpg")
+            for i in range(10)
+        )
+        orders = Order.objects.bulk_create(
+            Order(user=cls.user, total_amount=Decimal("39.96"), final_amount=Decimal("39.96"))
+            for _ in range(cls.ORDERS)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=j + 1, price_at_purchase_time=Decimal("9.99"),
+                      product_name=product.name, product_thumbnail_url=product.thumbnail_url)
+            for i, order in enumerate(orders)
+            for j, product in enumerate(products[i % 5:i % 5 + cls.ITEMS_PER_ORDER])
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def queries_for(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return queries.captured_queries, response
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        counts = {}
+        for limit in (1, 5, self.ORDERS):
+            queries, response = self.queries_for(f"/api/v1/orders/?limit={limit}")
+            counts[limit] = len(queries)
+            self.assertEqual(len(response.data["results"]), limit)
+
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_list_is_compact(self):
+        _, response = self.queries_for("/api/v1/orders/?limit=1")
+        order = response.data["results"][0]
+
+        self.assertEqual(order["item_count"], sum(range(1, self.ITEMS_PER_ORDER + 1)))
+        self.assertEqual(len(order["items"]), self.ITEMS_PER_ORDER)
+        self.assertEqual(set(order["items"][0]), {"id", "product", "quantity", "price_at_purchase_time"})
+        self.assertEqual(set(order["items"][0]["product"]), {"id", "name", "thumbnail_url"})
+
+    def test_reads_never_touch_products(self):
+        order = Order.objects.filter(user=self.user).first()
+        Product.objects.update(name="Renamed")
+
+        for path in ("/api/v1/orders/", f"/api/v1/orders/{order.id}/"):
+            queries, response = self.queries_for(path)
+            self.assertFalse([q["sql"] for q in queries if "products_product" in q["sql"]], path)
+
+        items = response.data["items"]
+        self.assertTrue(all(item["product"]["name"].startswith("History product") for item in items))
@@ -1,6 +1,6 @@
 from django.urls import path, include 
 from rest_framework.routers import DefaultRouter
-from .views import CartView, CartItemUpdateView, CheckoutView, OrderViewSet, AdminStatsView, AdminCouponCreateView, StripePaymentUpdateWebhookView
+from .views import CartView, CartBatchView, CartSummaryView, CartItemUpdateView, CheckoutView, OrderViewSet, AdminStatsView, AdminCouponCreateView, StripePaymentUpdateWebhookView
 
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet, basename='orders')
@@ -8,6 +8,8 @@ router.register(r'orders', OrderViewSet, basename='orders')
 urlpatterns = [
 
     path("cart/", CartView.as_view(), name='cart-detail'),
+    path("cart/summary/", CartSummaryView.as_view(), name="cart-summary"),
+    path("cart/batch/", CartBatchView.as_view(), name="cart-batch"),
     path("cart/item/<int:pk>/", CartItemUpdateView.as_view(), name="cart-item-update"),
     path("checkout/", CheckoutView.as_view(), name="checkout"),
     path("stripe/webhook", StripePaymentUpdateWebhookView.as_view(), name="stripe-payment-webhook"),
@@ -15,6 +17,7 @@ urlpatterns = [
     # admin paths
     path("admin/stats/", AdminStatsView.as_view(), name="admin-stats"),
     path("admin/coupon/generate/", AdminCouponCreateView.as_view(), name="admin-coupon-generate"),
+    path("admin/coupon/generate/<int:pk>/", AdminCouponCreateView.as_view(), name="admin-coupon-campaign"),
 
     path("", include(router.urls))
 ]
\ No newline at end of file
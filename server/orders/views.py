@@ -1,27 +1,127 @@
 from math import prod
+import json
 import os
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, serializers
 from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import extend_schema, extend_schema_serializer
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_serializer
 
 from .models import Cart, CartItem, Order, OrderItem
 from products.models import Product
-from .serializers import CartItemSerializer, OrderSerializer 
-from coupons.models import Coupon
-from django.db import transaction
-from decimal import Decimal
-from store.models import GlobalOrderCounter
+from .serializers import (
+    CartItemSerializer,
+    CartSummarySerializer,
+    CompactCartSerializer,
+    OrderListSerializer,
+    OrderSerializer,
+)
+from coupons.campaigns import start_campaign
+from coupons.models import Coupon, CouponCampaign
+from coupons.serializers import CouponCampaignSerializer
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max
+from django.utils import timezone
+from common.conditional import conditional, make_etag
+from common.idempotency import idempotent
+from common.stripe_client import get_stripe_client
+from .webhooks import dispatcher, record_event
+from .pricing import MAX_ORDER_AMOUNT, build_quote, from_cents
+from .guest import TOKEN_HEADER, GuestCart, read_token, token_from_request
 import stripe
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def cart_validators(view, request, *args, **kwargs):
+    if not request.user.is_authenticated:
+        return None, None
+
+    # item count catches deletes, updated_at catches adds/quantity changes,
+    # product updated_at catches price/name changes of the nested products
+    stats = CartItem.objects.filter(cart__owner=request.user).aggregate(
+        count=Count("id"),
+        items_modified=Max("updated_at"),
+        products_modified=Max("product__updated_at"),
+    )
+    etag = make_etag(
+        "cart", request.user.pk, request.query_params.get("view"),
+        stats["count"], stats["items_modified"], stats["products_modified"],
+    )
+    return etag, latest(stats["items_modified"], stats["products_modified"])
+
+
+def order_history_validators(view, request, *args, **kwargs):
+    orders = Order.objects.filter(user=request.user)
+    if "pk" in kwargs:
+        if not str(kwargs["pk"]).isdigit():
+            return None, None
+        orders = orders.filter(pk=kwargs["pk"])
+
+    # items carry their own product snapshot, so product edits don't change
+    # the response and the products table stays out of this query
+    stats = orders.aggregate(
+        count=Count("id"),
+        orders_modified=Max("updated_at"),
+    )
+    if not stats["count"]:
+        return None, None
+
+    etag = make_etag(
+        "orders", request.user.pk, kwargs.get("pk"),
+        stats["count"], stats["orders_modified"],
+    )
+    return etag, stats["orders_modified"]
+
+def cart_scope(request):
+    """Idempotency-Key scope that also separates guest carts
+
+    a guest without a cart token has nothing to scope the key by (a shared
+    scope would replay one guest's new cart token to another), so that first
+    request runs without idempotency.
+    """
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    guest_cart_id = read_token(token_from_request(request))
+    if guest_cart_id is None:
+        return None
+    return f"guest:{guest_cart_id}"
+
+
+def guest_response(guest, data, status=status.HTTP_200_OK):
+    """hands the (possibly new) guest cart token back to the client"""
+    response = Response(data, status=status)
+    if guest.token:
+        response.headers[TOKEN_HEADER] = guest.token
+    return response
+
+
+def apply_cart_operations(quantities, operations):
+    """replays add / set / remove operations on a {product_id: quantity} dict"""
+    quantities = dict(quantities)
+    for op in operations:
+        pid = op["product_id"]
+        if op["op"] == "add":
+            quantities[pid] = quantities.get(pid, 0) + op["quantity"]
+        elif op["op"] == "set":
+            quantities[pid] = op["quantity"]
+        else:
+            quantities.pop(pid, None)
+    return quantities
+
+
 class CartView(APIView):
-    permission_classes = [IsAuthenticated]
+    """signed in users get their Cart, anonymous shoppers a guest cart (see orders/guest.py)"""
+    permission_classes = [AllowAny]
 
     @extend_schema_serializer(component_name="AddToCartInputSerializer")
     class InputSerializer(serializers.Serializer):
@@ -30,21 +130,55 @@ class CartView(APIView):
 
     @extend_schema(
         summary="View My Cart",
+        description="`?view=compact` returns only the product fields the UI needs plus server computed totals.",
         tags=["Cart"],
+        parameters=[OpenApiParameter("view", str, enum=["compact"], required=False)],
         responses={200: CartItemSerializer(many=True)},
     )
+    @conditional(cart_validators, private=True)
     def get(self, request):
+        if not request.user.is_authenticated:
+            return self.guest_get(request)
+
+        if request.query_params.get("view") == "compact":
+            return Response(CompactCartSerializer(self.compact_cart(request.user)).data)
+
         cart, _ = Cart.objects.get_or_create(owner=request.user)
         items = cart.items.select_related("product").all()
 
         return Response(CartItemSerializer(items, many=True).data)
 
+    def compact_cart(self, user):
+        items = (
+            CartItem.objects.filter(cart__owner=user)
+            .select_related("product")
+            .only("id", "quantity", "product__id", "product__name", "product__price", "product__thumbnail_url")
+            .annotate(line_subtotal=ExpressionWrapper(
+                F("quantity") * F("product__price"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ))
+            .order_by("id")
+        )
+        return {**CartItem.objects.totals(user.id), "items": items}
+
+    def guest_get(self, request):
+        guest = GuestCart(token_from_request(request))
+        items = guest.items()
+
+        if request.query_params.get("view") == "compact":
+            for item in items:
+                item.line_subtotal = item.product.price * item.quantity
+            return guest_response(guest, CompactCartSerializer({**build_quote(items).totals(), "items": items}).data)
+
+        return guest_response(guest, CartItemSerializer(items, many=True).data)
+
     @extend_schema(
         summary="Add Item to Cart",
         tags=["Cart"],
         request=InputSerializer,
         responses={201: CartItemSerializer},
     )
+    @idempotent(cart_scope)
     def post(self, request):
         serializer = self.InputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -53,22 +187,144 @@ class CartView(APIView):
         qty = serializer.validated_data["quantity"]
 
         product = get_object_or_404(Product, id=prod_id)
-        cart, _ = Cart.objects.get_or_create(owner=request.user)
 
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
+        if not request.user.is_authenticated:
+            guest = GuestCart(token_from_request(request))
+            guest.add(product.id, qty)
+            guest.save()
+            cart_item = CartItem(product=product, quantity=guest.quantities[product.id])
+            return guest_response(guest, CartItemSerializer(cart_item).data, status=status.HTTP_201_CREATED)
 
-        if not created:
-            cart_item.quantity += qty
-        else:
-            cart_item.quantity = qty
+        # one INSERT ... ON CONFLICT DO UPDATE, the increment happens in the db
+        row = CartItem.objects.add_to_owner_cart(request.user.id, product.id, qty)
+        if row is None:
+            # first add ever, the user has no cart yet
+            Cart.objects.get_or_create(owner=request.user)
+            row = CartItem.objects.add_to_owner_cart(request.user.id, product.id, qty)
 
-        cart_item.save()
+        cart_item_id, quantity = row
+        cart_item = CartItem(id=cart_item_id, product=product, quantity=quantity)
 
         return Response(
             CartItemSerializer(cart_item).data, status=status.HTTP_201_CREATED
         )
 
 
+class CartSummaryView(APIView):
+    """item count and total for the header badge, without loading the lines"""
+    permission_classes = [AllowAny]
+
+    @extend_schema(summary="Cart Summary", tags=["Cart"], responses={200: CartSummarySerializer})
+    def get(self, request):
+        if not request.user.is_authenticated:
+            guest = GuestCart(token_from_request(request))
+            return guest_response(guest, CartSummarySerializer(build_quote(guest.items()).totals()).data)
+
+        return Response(CartSummarySerializer(CartItem.objects.totals(request.user.id)).data)
+
+
+class CartBatchView(APIView):
+    """applies many cart changes in one request and one transaction"""
+    permission_classes = [AllowAny]
+
+    class OperationSerializer(serializers.Serializer):
+        op = serializers.ChoiceField(choices=["add", "set", "remove"])
+        product_id = serializers.IntegerField()
+        quantity = serializers.IntegerField(min_value=1, required=False)
+
+        def validate(self, attrs):
+            if attrs["op"] != "remove" and "quantity" not in attrs:
+                raise serializers.ValidationError({"quantity": "This field is required."})
+            return attrs
+
+    @extend_schema_serializer(component_name="CartBatchInput")
+    class InputSerializer(serializers.Serializer):
+        operations = serializers.ListField(child=serializers.DictField(), min_length=1, max_length=500)
+
+        def validate_operations(self, value):
+            ops = CartBatchView.OperationSerializer(data=value, many=True)
+            ops.is_valid(raise_exception=True)
+            return ops.validated_data
+
+    @extend_schema(
+        summary="Batch Update Cart",
+        description="Applies add / set / remove operations in order, atomically, and returns the whole cart.",
+        tags=["Cart"],
+        request=InputSerializer,
+        responses={200: CartItemSerializer(many=True)},
+    )
+    @idempotent(cart_scope)
+    def post(self, request):
+        serializer = self.InputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data["operations"]
+
+        # every product id checked with one IN query
+        product_ids = {op["product_id"] for op in operations}
+        found = set(Product.objects.filter(id__in=product_ids).values_list("id", flat=True))
+        missing = sorted(product_ids - found)
+        if missing:
+            return Response(
+                {"error": "Unknown products", "product_ids": missing},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not request.user.is_authenticated:
+            guest = GuestCart(token_from_request(request))
+            guest.quantities = apply_cart_operations(guest.quantities, operations)
+            guest.save()
+            return guest_response(guest, CartItemSerializer(guest.items(), many=True).data)
+
+        with transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(owner=request.user)
+            # select_for_update can't lock a row that doesn't exist yet, so the rows
+            # this batch writes are inserted first (quantity 0, ON CONFLICT DO NOTHING).
+            # a concurrent add of the same product then either committed before and
+            # is read below, or waits for this transaction; it never inserts a duplicate
+            written = {op["product_id"] for op in operations if op["op"] != "remove"}
+            CartItem.objects.bulk_create(
+                [CartItem(cart=cart, product_id=pid, quantity=0) for pid in written],
+                ignore_conflicts=True,
+            )
+            existing = {
+                item.product_id: item
+                for item in cart.items.select_for_update().filter(product_id__in=product_ids)
+            }
+
+            # replay the operations on plain quantities first, then write the result
+            quantities = apply_cart_operations(
+                {pid: item.quantity for pid, item in existing.items() if item.quantity}, operations
+            )
+
+            now = timezone.now()
+            to_create, to_update = [], []
+            for pid, quantity in quantities.items():
+                item = existing.get(pid)
+                if item is None:
+                    to_create.append(CartItem(cart=cart, product_id=pid, quantity=quantity))
+                elif item.quantity != quantity:
+                    item.quantity = quantity
+                    item.updated_at = now  # bulk_update skips auto_now
+                    to_update.append(item)
+            to_delete = [item.id for pid, item in existing.items() if pid not in quantities]
+
+            if to_create:
+                # a row deleted since the insert above; upsert in case it is back
+                CartItem.objects.bulk_create(
+                    to_create,
+                    update_conflicts=True,
+                    unique_fields=["cart", "product"],
+                    update_fields=["quantity", "updated_at"],
+                )
+            if to_update:
+                CartItem.objects.bulk_update(to_update, ["quantity", "updated_at"])
+            if to_delete:
+                CartItem.objects.filter(id__in=to_delete).delete()
+
+        items = cart.items.select_related("product").order_by("id")
+        return Response(CartItemSerializer(items, many=True).data)
+
+
 class CartItemUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -86,6 +342,7 @@ class CartItemUpdateView(APIView):
         request=InputSerializer,
         responses={200: CartItemSerializer},
     )
+    @idempotent(cart_scope)
     def patch(self, request, pk):
         serializer = self.InputSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -101,6 +358,7 @@ class CartItemUpdateView(APIView):
     @extend_schema(
         summary="Remove Item from Cart", tags=["Cart"], responses={204: None}
     )
+    @idempotent(cart_scope)
     def delete(self, request, pk):
         cart_item = self.get_item(request.user, pk)
         cart_item.delete()
@@ -109,150 +367,181 @@ class CartItemUpdateView(APIView):
 
 
 class StripePaymentUpdateWebhookView(APIView):
+    """verifies and stores the event, the work happens in orders/webhooks.py"""
+
     def post(self, request):
         payload = request.body 
         sig_header = request.headers.get("STRIPE_SIGNATURE")
         endpoint_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
 
         try:
-            event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
+            event = get_stripe_client().construct_event(payload, sig_header, endpoint_secret)
         except (ValueError, stripe.error.SignatureVerificationError):
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        # Handle Successful Payment
-        if event["type"] == "checkout.session.completed":
-            session = event["data"]["object"]
-            
-            order_id = session["metadata"].get("order_id")
-            user_id = session["metadata"].get("user_id")
-
-            try:
-                order = Order.objects.get(id=order_id)
-                
-                order.status = "PAID"
-                order.save()
-
-                stats, _ = GlobalOrderCounter.objects.select_for_update().get_or_create(id=1)
-                stats.current_count += 1
-                stats.save()
-
-                Cart.objects.filter(owner_id=user_id).first().items.all().delete()
-                
-            except Order.DoesNotExist:
-                return Response(status=404)
+        # a redelivered event is already stored, Stripe still gets its 200
+        if record_event(json.loads(payload)) and settings.STRIPE_EVENTS_IN_PROCESS:
+            transaction.on_commit(dispatcher.notify)
 
         return Response(status=status.HTTP_200_OK)
 
 class CheckoutView(APIView):
+    """
+    Checkout runs in three steps so no lock is held while Stripe is called:
+
+    1. a short transaction locks and claims the coupon and writes the PENDING
+       order with its items
+    2. the Stripe calls (coupon, checkout session) run outside any transaction
+    3. the session id is recorded on the order, or, if Stripe failed, the order
+       is cancelled and the coupon released again
+    """
     permission_classes = [IsAuthenticated]
 
+    class CheckoutError(Exception):
+        def __init__(self, message, detail=None, status_code=status.HTTP_400_BAD_REQUEST):
+            super().__init__(message)
+            self.detail = detail
+            self.status_code = status_code
+
+        def as_response(self):
+            body = {"error": str(self)}
+            if self.detail:
+                body["detail"] = self.detail
+            return Response(body, status=self.status_code)
+
+    @idempotent()
     def post(self, request):
         user = request.user
         coupon_code = request.data.get("coupon_code")
 
         cart = get_object_or_404(Cart, owner=user)
-        items = cart.items.select_related("product").all()
-        if not items.exists():
+        items = list(cart.items.select_related("product").all())
+        if not items:
             return Response({"error": "Cart is empty"}, status=400)
 
-        # 1. Validation Logic (Coupons, etc.)
-        total_cost = sum(item.product.price * item.quantity for item in items)
-        discount_amount = Decimal(0)
+        try:
+            order, coupon_obj, quote = self.create_pending_order(user, items, coupon_code)
+        except self.CheckoutError as e:
+            return e.as_response()
+
+        try:
+            checkout_session = self.start_payment(user, order, quote, coupon_obj)
+        except Exception as e:
+            logger.error(f"Stripe checkout failed for order {order.id}, cancelling it: {e}")
+            self.cancel_pending_order(order, coupon_obj)
+            return Response({"error": "Payment provider error"}, status=status.HTTP_502_BAD_GATEWAY)
+
+        Order.objects.filter(id=order.id).update(
+            stripe_session_id=checkout_session.id, updated_at=timezone.now()
+        )
+
+        return Response({"checkout_url": checkout_session.url, "order_id": order.id})
+
+    def create_pending_order(self, user, items, coupon_code):
+        """step 1: one short local transaction, no network calls inside. raises CheckoutError"""
         coupon_obj = None
 
-        if coupon_code:
-            try:
-                # We LOCK the coupon here so they can't spam it in multiple tabs
-                coupon_obj = Coupon.objects.select_for_update().get(code=coupon_code)
+        with transaction.atomic():
+            if coupon_code:
+                try:
+                    # locked until commit, so two tabs can't both spend the coupon
+                    coupon_obj = Coupon.objects.select_for_update().get(code=coupon_code)
+                except Coupon.DoesNotExist:
+                    raise self.CheckoutError("Invalid Code")
+
                 if not coupon_obj.is_valid_for_user(user):
-                    return Response({"error": "Invalid Coupon"}, status=400)
-                
-                discount_amount = (Decimal(coupon_obj.discount_percentage) / 100) * total_cost
-            except Coupon.DoesNotExist:
-                return Response({"error": "Invalid Code"}, status=400)
+                    raise self.CheckoutError("Invalid Coupon")
 
-        final_amount = total_cost - discount_amount
+            # the one pass over the cart, everything below reads from the quote
+            quote = build_quote(items, coupon_obj.discount_percentage if coupon_obj else 0)
 
-        MAX_USD_LIMIT = Decimal(25000.00) 
-        
-        if final_amount > MAX_USD_LIMIT:
-            return Response(
-                {
-                    "error": "Transaction limit exceeded.",
-                    "detail": f"Due to regulatory limits, we cannot process orders above ${MAX_USD_LIMIT} in a single transaction."
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            if quote.exceeds_limit:
+                raise self.CheckoutError(
+                    "Transaction limit exceeded.",
+                    detail=f"Due to regulatory limits, we cannot process orders above ${from_cents(MAX_ORDER_AMOUNT)} in a single transaction.",
+                )
 
-        # 2. Create Order with PENDING status
-        # We do NOT clear the cart yet.
-        with transaction.atomic():
+            if coupon_obj:
+                coupon_obj.is_used = True
+                coupon_obj.save(update_fields=["is_used"])
+
+            # We do NOT clear the cart yet, that waits for the webhook
             order = Order.objects.create(
                 user=user,
-                total_amount=total_cost,
-                discount_amount=discount_amount,
-                final_amount=final_amount,
-                coupon_used=coupon_obj, 
-                status="PENDING", # Wait for webhook
+                total_amount=quote.subtotal,
+                discount_amount=quote.discount,
+                final_amount=quote.total,
+                coupon_used=coupon_obj,
+                status="PENDING",
             )
 
-            # Create OrderItems (Snapshot of prices)
-            order_items = [
+            # Create OrderItems (Snapshot of prices, names and thumbnails)
+            OrderItem.objects.bulk_create([
                 OrderItem(
                     order=order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    price_at_purchase_time=item.product.price,
-                ) for item in items
-            ]
-            OrderItem.objects.bulk_create(order_items)
-
-            stripe_discounts = []
-            if coupon_obj:
-                if coupon_obj.stripe_coupon_id:
-                    stripe_discounts = [{'coupon': coupon_obj.stripe_coupon_id}]
-                else:
-                    try:
-                        s_coupon = stripe.Coupon.create(
-                        percent_off=coupon_obj.discount_percentage,
-                        duration="once"
-                    )
-                        coupon_obj.stripe_coupon_id = s_coupon.id 
-                        coupon_obj.save(update_fields=['stripe_coupon_id'])
-                    except Exception as e:
-                        logger.error(f"Error creating Stripe coupon: {e}")
-                        return Response({"error": "Payment provider error"}, status=500)
-
-
-            line_items = []
-            for item in items:
-                line_items.append({
-                    'price_data': {
-                        'currency': 'usd',
-                        'product': item.product.stripe_product_id,
-                        'unit_amount': int(item.product.price * 100),
-                    },
-                    'quantity': item.quantity,
-                })
-            
-            if coupon_obj:
-                coupon_obj.is_used = True
-                coupon_obj.save()
-
-            checkout_session = stripe.checkout.Session.create(
-                line_items=line_items,
-                mode="payment",
-                discounts=stripe_discounts, 
-                customer_email=user.email,
-                success_url=f"http://localhost:3000/payment-success?order_id={order.id}",
-                cancel_url=f"http://localhost:3000/payment-failed?order_id={order.id}",
-                metadata={
-                    "order_id": order.id,
-                    "user_id": user.id
-                }
-            )
+                    product=line.product,
+                    quantity=line.quantity,
+                    price_at_purchase_time=line.unit_price,
+                    product_name=line.product.name,
+                    product_thumbnail_url=line.product.thumbnail_url,
+                ) for line in quote.lines
+            ])
+
+        return order, coupon_obj, quote
+
+    def start_payment(self, user, order, quote, coupon_obj):
+        """step 2: Stripe calls, outside any transaction"""
+        client = get_stripe_client()
+
+        stripe_discounts = []
+        if coupon_obj:
+            if not coupon_obj.stripe_coupon_id:
+                s_coupon = client.create_coupon(
+                    percent_off=coupon_obj.discount_percentage,
+                    duration="once"
+                )
+                coupon_obj.stripe_coupon_id = s_coupon.id
+                Coupon.objects.filter(id=coupon_obj.id).update(stripe_coupon_id=s_coupon.id)
+            stripe_discounts = [{'coupon': coupon_obj.stripe_coupon_id}]
+
+        line_items = []
+        for line in quote.lines:
+            price_data = {
+                'currency': 'usd',
+                'unit_amount': line.unit_amount,
+            }
+            # products whose Stripe sync is still queued are sent inline
+            if line.product.stripe_product_id:
+                price_data['product'] = line.product.stripe_product_id
+            else:
+                price_data['product_data'] = {'name': line.product.name}
+
+            line_items.append({
+                'price_data': price_data,
+                'quantity': line.quantity,
+            })
+
+        return client.create_checkout_session(
+            line_items=line_items,
+            mode="payment",
+            discounts=stripe_discounts,
+            customer_email=user.email,
+            success_url=f"http://localhost:3000/payment-success?order_id={order.id}",
+            cancel_url=f"http://localhost:3000/payment-failed?order_id={order.id}",
+            metadata={
+                "order_id": order.id,
+                "user_id": user.id
+            }
+        )
 
-        return Response({"checkout_url": checkout_session.url})
+    def cancel_pending_order(self, order, coupon_obj):
+        """step 3 on failure: undo step 1"""
+        with transaction.atomic():
+            Order.objects.filter(id=order.id, status="PENDING").update(
+                status="CANCELLED", updated_at=timezone.now()
+            )
+            if coupon_obj:
+                Coupon.objects.filter(id=coupon_obj.id).update(is_used=False)
 
 
 class OrderViewSet(viewsets.ReadOnlyModelViewSet):
@@ -260,7 +549,26 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = OrderSerializer 
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by("-created_at")
+        # items in one extra query per page, whatever its size; they carry
+        # their product snapshot, so the products table isn't read at all
+        return (
+            Order.objects.filter(user=self.request.user)
+            .prefetch_related("items")
+            .order_by("-created_at")
+        )
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return OrderListSerializer
+        return OrderSerializer
+
+    @conditional(order_history_validators, private=True)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(order_history_validators, private=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 
 class AdminStatsView(APIView):
@@ -268,4 +576,56 @@ class AdminStatsView(APIView):
 
 
 class AdminCouponCreateView(APIView):
-    pass
+    """bulk campaign coupons, generated and synced to Stripe in the background"""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema_serializer(component_name="CouponCampaignInput")
+    class InputSerializer(serializers.ModelSerializer):
+        """the prefix, size and expiry rules live on CouponCampaign, shared with the admin"""
+
+        class Meta:
+            model = CouponCampaign
+            fields = ["name", "prefix", "quantity", "discount_percentage", "expires_at"]
+
+        def validate(self, attrs):
+            CouponCampaign(**attrs).clean()
+            return attrs
+
+    @extend_schema(
+        summary="Generate Campaign Coupons",
+        description=(
+            "Admin only. Starts generating `quantity` single-use codes (PREFIX-XXXXXXXX) and "
+            "syncing them to Stripe in the background. Returns 202 with the campaign, poll it "
+            "for progress."
+        ),
+        tags=["Admin"],
+        request=InputSerializer,
+        responses={202: CouponCampaignSerializer},
+    )
+    def post(self, request):
+        serializer = self.InputSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            with transaction.atomic():
+                campaign = CouponCampaign.objects.create(created_by=request.user, **serializer.validated_data)
+                start_campaign(campaign)
+        except IntegrityError:
+            # two admins racing for the same prefix
+            return Response({"prefix": ["This prefix is already in use."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(CouponCampaignSerializer(campaign).data, status=status.HTTP_202_ACCEPTED)
+
+    @extend_schema(
+        summary="Coupon Campaign Progress",
+        description="Admin only. One campaign by id, or the latest campaigns.",
+        tags=["Admin"],
+        responses={200: CouponCampaignSerializer(many=True)},
+    )
+    def get(self, request, pk=None):
+        if pk is not None:
+            campaign = get_object_or_404(CouponCampaign, pk=pk)
+            return Response(CouponCampaignSerializer(campaign).data)
+
+        campaigns = CouponCampaign.objects.order_by("-id")[:50]
+        return Response(CouponCampaignSerializer(campaigns, many=True).data)
@@ -0,0 +1,191 @@
+"""
+Stripe webhook ingestion.
+
+The webhook view only verifies the signature and stores the event
+(`record_event`), keyed by its Stripe id, so a redelivered event is a no-op
+and Stripe gets its 200 right away. The work happens here, off the request:
+
+- `process_pending` claims due events in batches (with a lease, like the
+  product outbox) and handles them on a thread pool
+- each event is handled in one transaction together with flipping it to
+  DONE, and only if it is still PENDING, so an event is applied at most once
+  even if two workers or a replay race for it
+- failures are retried with backoff, then parked as FAILED
+
+`manage.py process_stripe_events` runs that loop as a separate worker; with
+STRIPE_EVENTS_IN_PROCESS=1, `dispatcher` runs it on a thread of every process
+instead (started by OrdersConfig.ready, woken by every new event).
+`manage.py replay_stripe_events` re-queues stored events.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from products.stripe_sync import backoff
+from store import counters as order_counter
+from .models import CartItem, Order, OrderItem, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+LEASE = timedelta(minutes=5)
+
+
+def record_event(event):
+    """stores a verified event, returns False if it was already stored"""
+    _, created = StripeEvent.objects.get_or_create(
+        event_id=event["id"],
+        defaults={"type": event["type"], "payload": event},
+    )
+    return created
+
+
+def checkout_session_completed(payload):
+    session = payload["data"]["object"]
+    order_id = session["metadata"].get("order_id")
+    user_id = session["metadata"].get("user_id")
+
+    # only a PENDING order becomes PAID, so the counter moves once per order
+    paid = Order.objects.filter(id=order_id, status="PENDING").update(
+        status="PAID", updated_at=timezone.now()
+    )
+    if not paid:
+        if not Order.objects.filter(id=order_id).exists():
+            raise Order.DoesNotExist(f"Order {order_id} not found")
+        logger.info(f"Order {order_id} is not pending anymore, nothing to do")
+        return
+
+    # events are handled after the fact, so only clear the lines that were
+    # checked out and haven't changed since, not what was added meanwhile
+    ordered_at = Order.objects.filter(id=order_id).values_list("created_at", flat=True).get()
+    CartItem.objects.filter(
+        cart__owner_id=user_id,
+        product_id__in=OrderItem.objects.filter(order_id=order_id).values("product_id"),
+        updated_at__lte=ordered_at,
+    ).delete()
+
+    # last, so the counter row is locked for as little of the transaction as possible
+    order_counter.increment()
+
+
+HANDLERS = {
+    "checkout.session.completed": checkout_session_completed,
+}
+
+
+def handle_event(event):
+    """applies one claimed event, raises on failure"""
+    handler = HANDLERS.get(event.type)
+
+    with transaction.atomic():
+        # the status flip is the dedupe: whoever flips it applies the event
+        claimed = StripeEvent.objects.filter(id=event.id, status=StripeEvent.PENDING).update(
+            status=StripeEvent.DONE, processed_at=timezone.now(), last_error=""
+        )
+        if claimed and handler is not None:
+            handler(event.payload)
+
+
+def claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=StripeEvent.PENDING, available_at__lte=now)
+            .order_by("id")[:batch_size]
+        )
+        if rows:
+            StripeEvent.objects.filter(id__in=[row.id for row in rows]).update(available_at=now + LEASE)
+    return rows
+
+
+def process_event(event, max_attempts):
+    """runs on a pool thread, returns True when the event was handled"""
+    try:
+        handle_event(event)
+        return True
+    except Exception as e:
+        event.attempts += 1
+        event.last_error = str(e)[:1000]
+        if event.attempts >= max_attempts:
+            event.status = StripeEvent.FAILED
+            logger.error(f"Giving up on Stripe event {event.event_id}: {e}")
+        else:
+            event.available_at = timezone.now() + backoff(event.attempts)
+            logger.warning(f"Stripe event {event.event_id} failed, will retry: {e}")
+        event.save(update_fields=["status", "attempts", "available_at", "last_error"])
+        return False
+    finally:
+        # pool threads outlive requests, don't let them sit on stale connections
+        close_old_connections()
+
+
+def process_pending(pool=None, batch_size=100, max_attempts=8, max_batches=None):
+    """handles due events until none are left, returns (done, failed)"""
+    own_pool = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=settings.STRIPE_EVENT_WORKERS)
+    done = failed = batches = 0
+
+    try:
+        while max_batches is None or batches < max_batches:
+            events = claim_batch(batch_size)
+            if not events:
+                break
+
+            for ok in pool.map(lambda event: process_event(event, max_attempts), events):
+                if ok:
+                    done += 1
+                else:
+                    failed += 1
+            batches += 1
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    return done, failed
+
+
+class EventDispatcher:
+    """processes events on a background thread, started by `ensure_started()`
+
+    it polls every `interval` seconds, so events left PENDING by a restart and
+    retries whose backoff has passed are picked up; `notify()` wakes it early.
+    """
+
+    def __init__(self, workers, interval=5.0):
+        self.workers = workers
+        self.interval = interval
+        self.wakeup = threading.Event()
+        self.pool = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stripe-events")
+                    self.thread = threading.Thread(target=self.run, name="stripe-event-dispatcher", daemon=True)
+                    self.thread.start()
+
+    def notify(self):
+        self.ensure_started()
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(timeout=self.interval)
+            self.wakeup.clear()
+            try:
+                process_pending(self.pool)
+            except Exception as e:
+                logger.exception(f"Stripe event dispatcher failed: {e}")
+            finally:
+                close_old_connections()
+
+
+dispatcher = EventDispatcher(workers=settings.STRIPE_EVENT_WORKERS)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product
+from .models import Product, ProductOutbox
 
 
 @admin.register(Product)
@@ -17,4 +17,12 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ("is_active", "created_at")
     search_fields = ("name", "uuid")
     ordering = ("-created_at",)
-    readonly_fields = ("stripe_product_id", "uuid", "created_at", "updated_at")
\ No newline at end of file
+    readonly_fields = ("stripe_product_id", "uuid", "created_at", "updated_at")
+
+
+@admin.register(ProductOutbox)
+class ProductOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "product", "action", "status", "attempts", "available_at", "processed_at")
+    list_filter = ("status", "action")
+    search_fields = ("product__name",)
+    readonly_fields = ("product", "action", "payload", "created_at", "processed_at")
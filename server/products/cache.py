@@ -0,0 +1,16 @@
+from common.cache import bump_version, get_or_build, versioned_key
+
+CATALOG_NAMESPACE = "catalog"
+
+
+def catalog_key(*parts):
+    return versioned_key(CATALOG_NAMESPACE, *parts)
+
+
+def invalidate_catalog():
+    """O(1): every cached list page and detail payload is dropped at once"""
+    bump_version(CATALOG_NAMESPACE)
+
+
+def cached_catalog_payload(key, build):
+    return get_or_build(key, build)
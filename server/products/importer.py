@@ -0,0 +1,116 @@
+"""
+Streaming readers for product dumps.
+
+Both readers yield one item at a time and only ever hold a chunk of the file
+(plus the item being decoded) in memory, so multi-GB dumps import with a flat
+memory profile.
+"""
+import json
+
+CHUNK_SIZE = 1 << 16
+# a decode error this close to the end of the buffer may be an item cut off by
+# the chunk boundary ("tru", "-Infinit", "1.", a split \uXXXX escape)
+CUT_OFF_TAIL = 16
+
+
+class ItemDecodeError(json.JSONDecodeError):
+    """a malformed item in a JSON array, `offset` is its UTF-8 byte offset in the file"""
+
+    def __init__(self, error, offset):
+        super().__init__(error.msg, error.doc, error.pos)
+        self.offset = offset
+        self.args = (f"{error.msg} in the item at byte {offset}",)
+
+
+def iter_ndjson(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def cut_off(error, buffer):
+    """whether a decode error may only mean the item continues in the next chunk"""
+    # an unterminated string runs to the end of the buffer
+    return error.pos >= len(buffer) - CUT_OFF_TAIL or error.msg.startswith("Unterminated string")
+
+
+def iter_json_array(f, chunk_size=CHUNK_SIZE):
+    """yields the elements of a top-level JSON array without loading the whole array
+
+    a malformed item raises ItemDecodeError right away, more of the file is
+    only read while the error can still be the chunk boundary.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    # bytes of the file before buffer[0]
+    offset = 0
+    eof = False
+    started = False
+
+    while True:
+        # skip whitespace, refilling the buffer as needed
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+
+        if pos >= len(buffer):
+            if eof:
+                raise json.JSONDecodeError("Unterminated array", buffer, pos)
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            offset += len(buffer[:pos].encode())
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        char = buffer[pos]
+
+        if not started:
+            if char != "[":
+                raise json.JSONDecodeError("Expected a JSON array", buffer, pos)
+            started = True
+            pos += 1
+            continue
+
+        if char == "]":
+            return
+
+        if char == ",":
+            pos += 1
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof or not cut_off(e, buffer):
+                raise ItemDecodeError(e, offset + len(buffer[:pos].encode())) from None
+            item, end = None, None
+
+        # an item that touches the end of the buffer may be cut off (e.g. a number)
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                raise json.JSONDecodeError("Truncated item", buffer, pos)
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            offset += len(buffer[:pos].encode())
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        yield item
+        pos = end
+
+
+def detect_format(f):
+    """peeks at the first non-blank character: '[' means a JSON array, anything else NDJSON"""
+    start = f.tell()
+    char = f.read(1)
+    while char and char.isspace():
+        char = f.read(1)
+    f.seek(start)
+    return "json" if char == "[" else "ndjson"
+
+
+def iter_items(f, fmt="auto"):
+    if fmt == "auto":
+        fmt = detect_format(f)
+    return iter_json_array(f) if fmt == "json" else iter_ndjson(f)
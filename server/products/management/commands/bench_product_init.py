@@ -0,0 +1,72 @@
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from products.models import Product
+
+
+def legacy_snapshot(product):
+    # what Product.__init__ used to do for every loaded row
+    product._original = {
+        field.name: getattr(product, field.name)
+        for field in product._meta.fields
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks Product instantiation from db rows (no database needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5, help='best of N runs')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+
+        field_names = [field.attname for field in Product._meta.concrete_fields]
+        now = datetime.now(timezone.utc)
+        values = [
+            (
+                i, uuid.uuid4(), f"Product {i}", "description " * 20, 50,
+                Decimal("19.99"), f"https://img.example.com/{i}.jpg",
+                True, f"prod_{i}", now, now,
+            )
+            for i in range(1, rows + 1)
+        ]
+
+        def load(snapshot):
+            for row in values:
+                product = Product.from_db(DEFAULT_DB_ALIAS, field_names, row)
+                if snapshot:
+                    legacy_snapshot(product)
+
+        def bulk_update_path(snapshot):
+            # load + assign one field per row, like fix_prices/bulk_update callers do
+            for row in values:
+                product = Product.from_db(DEFAULT_DB_ALIAS, field_names, row)
+                if snapshot:
+                    legacy_snapshot(product)
+                product.price = Decimal("9.99")
+
+        def best_of(func, snapshot):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func(snapshot)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        self.stdout.write(f"Instantiating {rows} Product rows, best of {repeat}:")
+
+        for label, func in (("load", load), ("load + assign", bulk_update_path)):
+            before = best_of(func, snapshot=True)
+            after = best_of(func, snapshot=False)
+            self.stdout.write(
+                f"  {label:<14} before: {before * 1000:8.2f} ms ({before / rows * 1e6:.2f} us/row)"
+                f"   after: {after * 1000:8.2f} ms ({after / rows * 1e6:.2f} us/row)"
+                f"   speedup: {before / after:.2f}x"
+            )
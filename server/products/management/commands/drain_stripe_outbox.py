@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from common.stripe_client import FakeStripeClient, get_stripe_client
+from products.stripe_sync import add_engine_arguments, drain_outbox, engine_from_options
+
+
+class Command(BaseCommand):
+    help = 'Pushes queued product changes (ProductOutbox) to Stripe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain what is due and exit')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=8)
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when idle')
+        add_engine_arguments(parser)
+        parser.add_argument('--fake', action='store_true', help='Use the in-memory fake Stripe client')
+
+    def handle(self, *args, **options):
+        client = FakeStripeClient() if options['fake'] else get_stripe_client()
+        engine = engine_from_options(options)
+
+        self.stdout.write(f"Draining Stripe outbox with {type(client).__name__}...")
+
+        try:
+            while True:
+                done, failed = drain_outbox(
+                    client,
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                    engine=engine,
+                )
+                if done or failed:
+                    self.stdout.write(f"Synced {done}, failed {failed}")
+
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS("Outbox drain stopped."))
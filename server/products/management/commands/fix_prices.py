@@ -1,13 +1,16 @@
 import random
-import time
 from decimal import Decimal
 from django.core.management.base import BaseCommand
 # Replace 'products' with your actual app name if different
 from products.models import Product  
+from products.stripe_sync import add_engine_arguments, drain_outbox, engine_from_options
 
 class Command(BaseCommand):
     help = 'Sanitizes DB data and syncs with Stripe'
 
+    def add_arguments(self, parser):
+        add_engine_arguments(parser)
+
     def handle(self, *args, **options):
         THRESHOLD = Decimal('5000.00')
         SAFE_TEMP_PRICE = Decimal('4999.99')
@@ -27,25 +30,21 @@ class Command(BaseCommand):
 
         # 2. Now that the data is valid (4999.99), we can safely load the objects
         # We fetch the specific products we just touched
-        products_to_fix = Product.objects.filter(price=SAFE_TEMP_PRICE)
+        products_to_fix = list(Product.objects.filter(price=SAFE_TEMP_PRICE).only('id', 'name', 'price'))
 
-        for i, product in enumerate(products_to_fix, 1):
+        for product in products_to_fix:
             # Generate the final random price
             random_val = random.uniform(50, 4500)
-            new_price = Decimal(str(random_val)).quantize(Decimal("0.01"))
-            
-            product.price = new_price
-            
-            try:
-                # 3. Call save() to push the change to Stripe
-                product.save()
-                self.stdout.write(
-                    f"[{i}/{rows_affected}] Stripe Synced '{product.name}': -> ${product.price}"
-                )
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Failed to sync {product.name}: {e}"))
-            
-            # Rate limiting
-            time.sleep(0.5)
-
-        self.stdout.write(self.style.SUCCESS("\nAll products fixed and synced with Stripe!"))
\ No newline at end of file
+            product.price = Decimal(str(random_val)).quantize(Decimal("0.01"))
+
+        # 3. One UPDATE per batch instead of a save() (and a sleep) per product.
+        # Prices are not mirrored on Stripe (checkout sends unit_amount), so
+        # the only Stripe work left is whatever the outbox already has queued.
+        Product.objects.bulk_update(products_to_fix, ['price'], batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f"Repriced {len(products_to_fix)} products."))
+
+        done, failed = drain_outbox(engine=engine_from_options(options, self.stdout.write))
+        if failed:
+            self.stdout.write(self.style.ERROR(f"{failed} Stripe syncs failed, they will be retried by drain_stripe_outbox"))
+
+        self.stdout.write(self.style.SUCCESS(f"\nAll products fixed, {done} pending Stripe syncs pushed!"))
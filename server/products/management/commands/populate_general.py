@@ -1,11 +1,14 @@
 import requests
 from django.core.management.base import BaseCommand
-from products.models import Product 
-import time
+from products.stripe_sync import add_engine_arguments, drain_outbox, engine_from_options
+from products.models import Product
 
 class Command(BaseCommand):
     help = 'Seeds database by combining Platzi and DummyJSON APIs'
 
+    def add_arguments(self, parser):
+        add_engine_arguments(parser)
+
     def handle(self, *args, **options):
         # 1. Define our two sources
         sources = [
@@ -59,13 +62,9 @@ class Command(BaseCommand):
                             thumbnail_url=mapped['img'],
                             is_active=True
                         )
-                        p.save() # Triggers Stripe
+                        p.save() # Queues the Stripe sync
                         total_created += 1
                         print(f"Created: {p.name}")
-                        
-                        # Anti-rate-limit sleep
-                        if total_created % 10 == 0:
-                            time.sleep(0.5)
 
                     except Exception as e:
                         print(f"Error: {e}")
@@ -73,4 +72,8 @@ class Command(BaseCommand):
             except Exception as e:
                 print(f"Failed source: {e}")
 
-        self.stdout.write(self.style.SUCCESS(f"Total products created: {total_created}"))
\ No newline at end of file
+        self.stdout.write("Syncing new products to Stripe...")
+        done, failed = drain_outbox(engine=engine_from_options(options, self.stdout.write))
+        self.stdout.write(f"Stripe synced {done}, failed {failed}")
+
+        self.stdout.write(self.style.SUCCESS(f"Total products created: {total_created}"))
@@ -1,13 +1,14 @@
 import requests
 from django.core.management.base import BaseCommand
-from products.models import Product  
-import time
+from products.stripe_sync import add_engine_arguments, drain_outbox, engine_from_options
+from products.models import Product 
 
 class Command(BaseCommand):
     help = 'Seeds database with real cosmetic products (Maybelline, etc.)'
 
     def add_arguments(self, parser):
         parser.add_argument('limit', type=int, nargs='?', default=250, help='Number of products to create')
+        add_engine_arguments(parser)
 
     def handle(self, *args, **options):
         limit = options['limit']
@@ -61,16 +62,16 @@ class Command(BaseCommand):
                     thumbnail_url=image,
                     is_active=True
                 )
-                p.save() # Triggers Stripe
+                p.save() # Queues the Stripe sync
                 
                 count += 1
                 self.stdout.write(self.style.SUCCESS(f"[{count}/{limit}] Created: {p.name}"))
-                
-                # Sleep to be safe with Stripe API limits
-                if count % 20 == 0:
-                    time.sleep(1)
 
             except Exception as e:
                 self.stdout.write(self.style.WARNING(f"Skipped {full_name}: {e}"))
 
-        self.stdout.write(self.style.SUCCESS(f"Successfully seeded {count} real products."))
\ No newline at end of file
+        self.stdout.write("Syncing new products to Stripe...")
+        done, failed = drain_outbox(engine=engine_from_options(options, self.stdout.write))
+        self.stdout.write(f"Stripe synced {done}, failed {failed}")
+
+        self.stdout.write(self.style.SUCCESS(f"Successfully seeded {count} real products."))
@@ -1,105 +1,152 @@
 import json
 import os
 import time
+from pathlib import Path
 from django.core.management.base import BaseCommand
-from products.models import Product
+from django.db import transaction
+from products.importer import iter_items
+from products.models import Product, ProductOutbox
+from products.stripe_sync import drain_outbox
+
+DEFAULT_PATH = Path(__file__).resolve().parents[1] / 'product_list.json'
+
+
+def normalize_item(item):
+    """maps one Amazon dump item to Product fields"""
+    original_title = item.get('title', 'Unknown Product')
+
+    # --- Logic 1: Clean Title (Split by '-' OR max 3 words) ---
+    # First, try to split by " - " or just "-"
+    if "-" in original_title:
+        clean_name = original_title.split('-')[0].strip()
+    else:
+        clean_name = original_title
+
+    # If the result is still more than 3 words, chop it
+    words = clean_name.split()
+    if len(words) > 3:
+        clean_name = " ".join(words[:3])
+
+    # Remove trailing commas/spaces
+    clean_name = clean_name.strip(', ')
+
+    # --- Logic 2: Description (Use Title if missing) ---
+    description = item.get('description')
+
+    # If description is null/None or empty string
+    if not description:
+        description = f"Product: {original_title}"
+
+    # Truncate to 500 chars (Model limit)
+    description = description[:500]
+
+    # --- Logic 3: Price ---
+    price_data = item.get('price')
+    # Handle the structure: "price": { "value": 39.99, "currency": "$" }
+    if isinstance(price_data, dict):
+        price = price_data.get('value', 19.99)
+    else:
+        price = 19.99  # Fallback
+
+    # Ensure price isn't 0
+    if not price or float(price) == 0:
+        price = 19.99
+
+    # --- Logic 4: Thumbnail ---
+    image_url = item.get('thumbnailImage')
+
+    return {
+        'name': clean_name,
+        'description': description,
+        'quantity': 50,
+        'price': price,
+        'thumbnail_url': image_url,
+        'is_active': True,
+    }
+
 
 class Command(BaseCommand):
-    help = 'Seeds database with Amazon product data from a specific JSON file'
+    help = 'Streams Amazon product data from a JSON array or NDJSON file into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=str(DEFAULT_PATH), help='JSON array or NDJSON file')
+        parser.add_argument('--format', choices=['auto', 'json', 'ndjson'], default='auto')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk_create')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and dedupe only, report throughput')
+        parser.add_argument('--sync-stripe', action='store_true', help='Drain the Stripe outbox after importing')
 
     def handle(self, *args, **options):
-        # 1. Target the specific file path
-        file_path = '/Users/quantumbyte/Desktop/build/checkout/server/products/management/product_list.json'
+        file_path = options['path']
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
 
         if not os.path.exists(file_path):
             self.stdout.write(self.style.ERROR(f"File NOT found at: {file_path}"))
             return
 
-        # 2. Load the JSON
+        # one pass over existing names instead of an exists() query per item
+        seen_names = set(Product.objects.values_list('name', flat=True).iterator(chunk_size=5000))
+        self.stdout.write(f"Loaded {len(seen_names)} existing product names. Streaming {file_path}...")
+
+        count = 0
+        skipped = 0
+        parsed = 0
+        batch = []
+        started = time.perf_counter()
+
+        def flush():
+            nonlocal count
+            if not batch:
+                return
+            if not dry_run:
+                # products + their Stripe sync rows land together, Stripe is called later
+                with transaction.atomic():
+                    created = Product.objects.bulk_create(batch)
+                    ProductOutbox.objects.bulk_create(
+                        [ProductOutbox(product=p, action=ProductOutbox.CREATE) for p in created]
+                    )
+            count += len(batch)
+            batch.clear()
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"[{count}] {'Would create' if dry_run else 'Created'} ({count / elapsed:,.0f} rows/s)")
+
         with open(file_path, 'r', encoding='utf-8') as f:
             try:
-                data = json.load(f)
-            except json.JSONDecodeError:
-                self.stdout.write(self.style.ERROR("The file contains invalid JSON."))
+                for item in iter_items(f, options['format']):
+                    parsed += 1
+                    fields = normalize_item(item)
+
+                    # Check for duplicates to avoid duplicate DB entries
+                    if fields['name'] in seen_names:
+                        skipped += 1
+                        continue
+                    seen_names.add(fields['name'])
+
+                    batch.append(Product(**fields))
+                    if len(batch) >= batch_size:
+                        flush()
+
+                flush()
+            except json.JSONDecodeError as e:
+                flush()
+                self.stdout.write(self.style.ERROR(f"The file contains invalid JSON: {e}"))
                 return
 
-        self.stdout.write(f"Loaded {len(data)} items. Processing...")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Parsed {parsed} items in {elapsed:.2f}s ({parsed / max(elapsed, 1e-9):,.0f} items/s)"
+        )
 
-        count = 0
-        skipped = 0
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"\nDry run: would create {count}, skip {skipped}"))
+            return
 
-        for item in data:
-            original_title = item.get('title', 'Unknown Product')
-            
-            # --- Logic 1: Clean Title (Split by '-' OR max 3 words) ---
-            # First, try to split by " - " or just "-"
-            if "-" in original_title:
-                clean_name = original_title.split('-')[0].strip()
-            else:
-                clean_name = original_title
-
-            # If the result is still more than 3 words, chop it
-            words = clean_name.split()
-            if len(words) > 3:
-                clean_name = " ".join(words[:3])
-            
-            # Remove trailing commas/spaces
-            clean_name = clean_name.strip(', ')
-
-            # --- Logic 2: Description (Use Title if missing) ---
-            description = item.get('description')
-            
-            # If description is null/None or empty string
-            if not description:
-                description = f"Product: {original_title}"
-            
-            # Truncate to 500 chars (Model limit)
-            description = description[:500]
-
-            # --- Logic 3: Price ---
-            price_data = item.get('price')
-            # Handle the structure: "price": { "value": 39.99, "currency": "$" }
-            if isinstance(price_data, dict):
-                price = price_data.get('value', 19.99)
-            else:
-                price = 19.99  # Fallback
-            
-            # Ensure price isn't 0
-            if float(price) == 0:
-                price = 19.99
-
-            # --- Logic 4: Thumbnail ---
-            image_url = item.get('thumbnailImage')
-
-            # --- Logic 5: Save (Triggers Stripe) ---
-            
-            # Check for duplicates to avoid Stripe errors or duplicate DB entries
-            if Product.objects.filter(name=clean_name).exists():
-                self.stdout.write(self.style.WARNING(f"Skipped (Duplicate): {clean_name}"))
-                skipped += 1
-                continue
+        if options['sync_stripe']:
+            self.stdout.write("Syncing new products to Stripe...")
+            done, failed = drain_outbox()
+            self.stdout.write(f"Stripe synced {done}, failed {failed}")
+        else:
+            self.stdout.write("Stripe sync queued, run `manage.py drain_stripe_outbox` to push it.")
 
-            try:
-                p = Product(
-                    name=clean_name,
-                    description=description,
-                    quantity=50,
-                    price=price,
-                    thumbnail_url=image_url,
-                    is_active=True
-                )
-                
-                # Triggers the Stripe API call in your model's save() method
-                p.save() 
-
-                count += 1
-                self.stdout.write(self.style.SUCCESS(f"[{count}] Created: {clean_name} (${price})"))
-
-                # Rate limiting for Stripe (safe side)
-                if count % 10 == 0:
-                    time.sleep(1)
-
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Error creating {clean_name}: {e}"))
-
-        self.stdout.write(self.style.SUCCESS(f"\nCompleted! Created: {count}, Skipped: {skipped}"))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"\nCompleted! Created: {count}, Skipped: {skipped}"))
@@ -1,13 +1,38 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 import logging
 from common.models import BaseModel
-import stripe
-import os
+from common.tracking import DirtyFieldsMixin, track_changes
+from .cache import invalidate_catalog
 
-stripe.api_key = os.getenv("STRIPE_API_KEY")
 
+class ProductQuerySet(models.QuerySet):
+    """bulk write paths skip Product.save, so they invalidate the catalog cache here
 
-class Product(BaseModel):
+    bulk_update() goes through update() so it is covered as well.
+    """
+
+    def update(self, **kwargs):
+        # auto_now is not applied by update(), but conditional GETs rely on updated_at
+        kwargs.setdefault("updated_at", timezone.now())
+        rows = super().update(**kwargs)
+        invalidate_catalog()
+        return rows
+
+    def delete(self):
+        result = super().delete()
+        invalidate_catalog()
+        return result
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        invalidate_catalog()
+        return created
+
+
+# only the fields mirrored to Stripe need change tracking
+@track_changes("name", "description", "thumbnail_url")
+class Product(DirtyFieldsMixin, BaseModel):
     name = models.CharField(max_length=255, db_index=True)
     description = models.CharField(max_length=500, default="")
     quantity = models.PositiveIntegerField(default=0)
@@ -22,67 +47,103 @@ class Product(BaseModel):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created_at"]
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._original = {
-            field.name: getattr(self, field.name)
-            for field in self._meta.fields
-        }
+        indexes = [
+            # backs the keyset (cursor) pagination of the catalog
+            models.Index(fields=["-created_at", "-id"], name="product_catalog_cursor_idx"),
+            # active (or inactive) products in Meta.ordering, the admin's is_active filter
+            models.Index(fields=["is_active", "-created_at"], name="product_active_created_idx"),
+        ]
 
     def save(self, *args, **kwargs):
-        creating = self.pk is None
-
-        if creating:
-            logging.debug("Creating Stripe product...")
+        """saves locally and queues the Stripe sync in the same transaction
 
-            product = stripe.Product.create(
-                name=self.name,
-                description=self.description,
-                images=[self.thumbnail_url],
-                shippable=True,
-            )
-
-            logging.debug(f"Stripe product created: {product.id}")
+        the actual Stripe call happens later in the outbox drain
+        (see products/stripe_sync.py), so a save never waits on the network.
+        """
+        creating = self.pk is None
+        changed_fields = {} if creating else self.get_dirty_fields()
 
-            self.stripe_product_id = product.id
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-        else:
-            changed_fields = {
-                field: getattr(self, field)
-                for field, old in self._original.items()
-                if getattr(self, field) != old
-            }
+            if creating and not self.stripe_product_id:
+                ProductOutbox.objects.create(product=self, action=ProductOutbox.CREATE)
 
-            if changed_fields:
+            elif changed_fields:
                 logging.debug(f"Changed fields detected: {changed_fields}")
+                ProductOutbox.objects.create(
+                    product=self,
+                    action=ProductOutbox.UPDATE,
+                    payload={"fields": sorted(changed_fields)},
+                )
+
+        invalidate_catalog()
+
+        self.reset_dirty_fields()
+
+    def stripe_params(self, fields=None):
+        """the Stripe product params for this product, optionally limited to `fields`"""
+        params = {
+            "name": self.name,
+            "description": self.description,
+            "images": [self.thumbnail_url] if self.thumbnail_url else [],
+        }
+        if fields is None:
+            return params
 
-                update_payload = {}
-
-                if "name" in changed_fields:
-                    update_payload["name"] = self.name
-
-                if "description" in changed_fields:
-                    update_payload["description"] = self.description
+        # thumbnail_url is mirrored as `images` on Stripe
+        wanted = {"images" if field == "thumbnail_url" else field for field in fields}
+        return {key: value for key, value in params.items() if key in wanted}
 
-                if "thumbnail_url" in changed_fields:
-                    update_payload["images"] = [self.thumbnail_url]
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_catalog()
+        return result
 
-                if update_payload:
-                    stripe.Product.modify(
-                        self.stripe_product_id,
-                        **update_payload
-                    )
-                    logging.debug(f"Stripe updated: {update_payload}")
+    def __str__(self):
+        return self.name
+
+
+class ProductOutbox(BaseModel):
+    """pending Stripe syncs, written in the same transaction as the product"""
+
+    CREATE = "CREATE"
+    UPDATE = "UPDATE"
+    ACTION_CHOICES = [
+        (CREATE, "Create"),
+        (UPDATE, "Update"),
+    ]
+
+    PENDING = "PENDING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="outbox")
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # for updates: {"fields": [...]} that changed, values are read at sync time
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
 
-        super().save(*args, **kwargs)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
 
-        self._original = {
-            field.name: getattr(self, field.name)
-            for field in self._meta.fields
-        }
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"], name="product_outbox_due_idx"),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.action} product {self.product_id} ({self.status})"
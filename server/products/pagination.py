@@ -0,0 +1,78 @@
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    LimitOffsetPagination,
+)
+
+
+class CatalogCursorPagination(CursorPagination):
+    """keyset pagination over (-created_at, -id)
+
+    no COUNT(*) and no OFFSET scan, every page is an index range read
+    no matter how deep into the catalog the client is.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+
+class CatalogPagination(BasePagination):
+    """offset pagination by default, cursor pagination on request
+
+    existing clients keep getting `count`/`next`/`previous` with limit/offset.
+    clients that send `?pagination=cursor` (or follow a `cursor` link) get
+    keyset pages instead, which is what the nightly catalog crawl should use.
+    """
+
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+
+    def __init__(self):
+        self.offset_paginator = LimitOffsetPagination()
+        self.cursor_paginator = CatalogCursorPagination()
+        self.active = self.offset_paginator
+
+    def use_cursor(self, request):
+        if request.query_params.get(self.mode_query_param) == self.cursor_mode:
+            return True
+        return self.cursor_paginator.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.active = self.cursor_paginator
+        else:
+            self.active = self.offset_paginator
+
+        return self.active.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.offset_paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.active.to_html()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.active, "display_page_controls", False)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = self.offset_paginator.get_schema_operation_parameters(view)
+        parameters.append({
+            "name": self.mode_query_param,
+            "required": False,
+            "in": "query",
+            "description": "Set to 'cursor' to switch to keyset pagination (no total count).",
+            "schema": {"type": "string", "enum": [self.cursor_mode]},
+        })
+        parameters.append({
+            "name": self.cursor_paginator.cursor_query_param,
+            "required": False,
+            "in": "query",
+            "description": "The pagination cursor value (cursor mode only).",
+            "schema": {"type": "string"},
+        })
+        return parameters
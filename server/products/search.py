@@ -0,0 +1,86 @@
+"""
+Full-text search over the product catalog.
+
+The index itself lives in the database and is maintained there:
+- SQLite: an external-content FTS5 table kept in sync by triggers
+- Postgres: a generated tsvector column with a GIN index
+
+Both are updated on every write path (Product.save, bulk_create, queryset
+update()/delete(), raw SQL), so nothing in Python has to remember to reindex.
+See products/migrations/0003_product_search_index.py for the DDL.
+"""
+import re
+
+from django.db import connection
+
+from .models import Product
+
+FTS_TABLE = "products_product_fts"
+
+# name matches count 10x more than description matches when ranking
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def parse_terms(query):
+    """splits the user query into safe search terms (no operators leak through)"""
+    return _TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+def _sqlite_search(terms, limit, offset):
+    # every term is a quoted prefix query, implicitly AND-ed together
+    match = " ".join(f'"{term}"*' for term in terms)
+
+    sql = (
+        f"SELECT rowid FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s "
+        f"ORDER BY bm25({FTS_TABLE}, %s, %s) "
+        f"LIMIT %s OFFSET %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, NAME_WEIGHT, DESCRIPTION_WEIGHT, limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _postgres_search(terms, limit, offset):
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+
+    sql = (
+        "SELECT id FROM products_product, to_tsquery('simple', %s) query "
+        "WHERE search_vector @@ query "
+        "ORDER BY ts_rank(search_vector, query) DESC, id DESC "
+        "LIMIT %s OFFSET %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tsquery, limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_product_ids(query, limit=20, offset=0):
+    """returns product ids ranked by relevance, best match first"""
+    terms = parse_terms(query)
+    if not terms:
+        return []
+
+    if connection.vendor == "sqlite":
+        return _sqlite_search(terms, limit, offset)
+
+    if connection.vendor == "postgresql":
+        return _postgres_search(terms, limit, offset)
+
+    # no index for other backends, keep the endpoint usable for local hacking
+    qs = Product.objects.all()
+    for term in terms:
+        qs = qs.filter(name__icontains=term)
+    return list(qs.order_by("-id").values_list("id", flat=True)[offset:offset + limit])
+
+
+def search_products(query, limit=20, offset=0):
+    """returns Product instances in ranked order"""
+    ids = search_product_ids(query, limit=limit, offset=offset)
+    products = Product.objects.in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
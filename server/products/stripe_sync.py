@@ -0,0 +1,199 @@
+"""
+Drains the ProductOutbox to Stripe.
+
+Rows are claimed in batches (with a short lease so parallel drains don't pick
+up the same rows), pushed to Stripe concurrently through the SyncEngine, and
+their outcome is written back with one bulk update per batch. The outbox rows
+are the checkpoint: a drain that is interrupted resumes with whatever is
+still pending. Failures are retried with exponential backoff and jitter until
+`max_attempts`, after which the row is parked as FAILED.
+
+A product's rows always move together: when its sync fails, every pending row
+of the product is pushed back to the same retry time, so an update can't be
+claimed before the create it depends on. An update that still finds no
+Stripe product waits for the pending create without spending an attempt.
+"""
+import logging
+import random
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from common.stripe_client import get_stripe_client
+from common.sync_engine import SyncEngine
+from .models import Product, ProductOutbox
+
+logger = logging.getLogger(__name__)
+
+LEASE = timedelta(minutes=5)
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 15 * 60
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** attempts, BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+class WaitingForCreate(RuntimeError):
+    """an update for a product whose create hasn't reached Stripe yet"""
+
+
+def claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            ProductOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=ProductOutbox.PENDING, available_at__lte=now)
+            .order_by("id")[:batch_size]
+        )
+        if rows:
+            ProductOutbox.objects.filter(id__in=[row.id for row in rows]).update(available_at=now + LEASE)
+    return rows
+
+
+def group_by_product(rows):
+    """one create and/or one merged update per product, in outbox order"""
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.product_id, []).append(row)
+    return grouped
+
+
+def sync_product(client, product, rows):
+    """pushes one product's pending rows, returns nothing, raises on Stripe errors"""
+    creates = [row for row in rows if row.action == ProductOutbox.CREATE]
+    updates = [row for row in rows if row.action == ProductOutbox.UPDATE]
+
+    if creates and not product.stripe_product_id:
+        # the create reads the current row, so it already carries any queued updates
+        stripe_product = client.create_product(shippable=True, **product.stripe_params())
+        product.stripe_product_id = stripe_product.id
+        logger.debug(f"Stripe product created: {stripe_product.id}")
+        return
+
+    if updates:
+        if not product.stripe_product_id:
+            raise WaitingForCreate("product is not on Stripe yet, waiting for its create")
+
+        fields = set()
+        for row in updates:
+            fields.update(row.payload.get("fields", []))
+
+        params = product.stripe_params(fields)
+        if params:
+            client.modify_product(product.stripe_product_id, **params)
+            logger.debug(f"Stripe updated: {params}")
+
+
+def default_engine(**kwargs):
+    return SyncEngine(workers=settings.STRIPE_SYNC_WORKERS, rate=settings.STRIPE_SYNC_RATE, **kwargs)
+
+
+def add_engine_arguments(parser):
+    """--workers/--rate for management commands that push to Stripe"""
+    parser.add_argument('--workers', type=int, default=settings.STRIPE_SYNC_WORKERS)
+    parser.add_argument('--rate', type=float, default=settings.STRIPE_SYNC_RATE, help='Max Stripe requests per second')
+
+
+def engine_from_options(options, write=None):
+    progress = None
+    if write is not None:
+        progress = lambda r: write(f"[{r.done + r.failed}/{r.total}] {r.rate:.1f} req/s, {r.retries} retries")
+    return SyncEngine(workers=options['workers'], rate=options['rate'], progress=progress)
+
+
+def process_batch(rows, client, max_attempts, engine):
+    """returns (done, failed) row counts"""
+    now = timezone.now()
+    products = Product.objects.in_bulk({row.product_id for row in rows})
+    grouped = group_by_product(rows)
+    had_stripe_id = {pk for pk, product in products.items() if product.stripe_product_id}
+
+    report = engine.run(
+        (product_id, partial(sync_product, client, products[product_id], product_rows))
+        for product_id, product_rows in grouped.items()
+        if product_id in products
+    )
+
+    created = [
+        product for pk, product in products.items()
+        if pk not in had_stripe_id and product.stripe_product_id
+    ]
+    waiting = [pk for pk, error in report.errors.items() if isinstance(error, WaitingForCreate)]
+    create_due = dict(
+        ProductOutbox.objects.filter(product_id__in=waiting, action=ProductOutbox.CREATE, status=ProductOutbox.PENDING)
+        .values_list("product_id")
+        .annotate(Min("available_at"))
+    )
+    retry_at = {}
+    done = failed = 0
+
+    for product_id, product_rows in grouped.items():
+        error = report.errors.get(product_id)
+
+        if error is None:
+            for row in product_rows:
+                row.status = ProductOutbox.DONE
+                row.processed_at = now
+                row.last_error = ""
+                done += 1
+            continue
+
+        if product_id in create_due:
+            # not a failure: the update goes out with the create
+            for row in product_rows:
+                row.available_at = create_due[product_id]
+                row.last_error = str(error)[:1000]
+            continue
+
+        # one retry time for the whole product
+        attempts = max(row.attempts for row in product_rows) + 1
+        retry_at[product_id] = now + backoff(attempts)
+        for row in product_rows:
+            row.attempts += 1
+            row.last_error = str(error)[:1000]
+            if row.attempts >= max_attempts:
+                row.status = ProductOutbox.FAILED
+                logger.error(f"Giving up on Stripe sync for product {product_id}: {error}")
+            else:
+                row.available_at = retry_at[product_id]
+                logger.warning(f"Stripe sync for product {product_id} failed, will retry: {error}")
+            failed += 1
+
+    with transaction.atomic():
+        if created:
+            Product.objects.bulk_update(created, ["stripe_product_id"])
+        ProductOutbox.objects.bulk_update(
+            rows, ["status", "attempts", "available_at", "last_error", "processed_at"]
+        )
+        # the product's rows outside this batch don't run ahead of the retry either
+        for product_id, at in retry_at.items():
+            ProductOutbox.objects.filter(
+                product_id=product_id, status=ProductOutbox.PENDING, available_at__lt=at,
+            ).exclude(id__in=[row.id for row in grouped[product_id]]).update(available_at=at)
+
+    return done, failed
+
+
+def drain_outbox(client=None, batch_size=100, max_attempts=8, max_batches=None, engine=None):
+    """processes due rows until none are left, returns (done, failed) totals"""
+    client = client or get_stripe_client()
+    engine = engine or default_engine()
+    total_done = total_failed = batches = 0
+
+    while max_batches is None or batches < max_batches:
+        rows = claim_batch(batch_size)
+        if not rows:
+            break
+
+        done, failed = process_batch(rows, client, max_attempts, engine)
+        total_done += done
+        total_failed += failed
+        batches += 1
+
+    return total_done, total_failed
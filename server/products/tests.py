@@ -1,3 +1,69 @@
-from django.test import TestCase
+import io
+import json
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+from .importer import ItemDecodeError, iter_json_array
+from .models import Product, ProductOutbox
+
+
+class ProductChangeTrackingTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Mug", description="Blue", price="9.99")
+
+    def updates(self):
+        return list(
+            ProductOutbox.objects.filter(product=self.product, action=ProductOutbox.UPDATE)
+            .values_list("payload", flat=True)
+        )
+
+    def test_loading_a_deferred_field_keeps_pending_changes(self):
+        product = Product.objects.only("id", "name").get(pk=self.product.pk)
+        product.name = "Renamed"
+        product.description  # loads the deferred field through refresh_from_db(fields=[...])
+        product.save()
+
+        self.assertEqual(self.updates(), [{"fields": ["name"]}])
+
+    def test_assigning_a_deferred_field_is_a_change(self):
+        product = Product.objects.only("id", "price").get(pk=self.product.pk)
+        product.name = "Renamed"
+        product.save()
+
+        self.assertEqual(self.updates(), [{"fields": ["name"]}])
+
+    def test_refreshing_a_changed_field_drops_its_change(self):
+        product = Product.objects.get(pk=self.product.pk)
+        product.name = "Renamed"
+        product.description = "Red"
+        product.refresh_from_db(fields=["name"])
+        product.save()
+
+        self.assertEqual(self.updates(), [{"fields": ["description"]}])
+
+    def test_full_refresh_drops_every_change(self):
+        product = Product.objects.get(pk=self.product.pk)
+        product.name = "Renamed"
+        product.refresh_from_db()
+        product.save()
+
+        self.assertEqual(self.updates(), [])
+
+
+class JsonArrayReaderTests(SimpleTestCase):
+    def test_items_cut_by_the_chunk_boundary_are_read_whole(self):
+        items = [{"name": "Mug é", "price": -1.5e-3, "active": True, "tags": None}] * 20
+        text = json.dumps(items, ensure_ascii=False)
+        for chunk_size in range(1, 30):
+            self.assertEqual(list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)), items)
+
+    def test_malformed_item_fails_without_reading_the_rest(self):
+        items = [json.dumps({"name": f"product {i}"}) for i in range(10_000)]
+        items[10] = '{"name": "broken" "price": 1}'
+        f = io.StringIO("[" + ",".join(items) + "]")
+
+        with self.assertRaises(ItemDecodeError) as raised:
+            list(iter_json_array(f, chunk_size=256))
+
+        self.assertEqual(raised.exception.offset, len("[" + ",".join(items[:10]) + ","))
+        self.assertLess(f.tell(), 1024)
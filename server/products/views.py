@@ -1,15 +1,50 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, serializers, status
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAdminUser
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from rest_framework.response import Response
+from django.db.models import Count, Max
+from drf_spectacular.utils import extend_schema, extend_schema_view, inline_serializer
 from .models import Product
 from .serializers import ProductSerializer
+from .pagination import CatalogPagination
+from .search import search_products
+from .cache import catalog_key, cached_catalog_payload
+from common.conditional import conditional, make_etag
+
+
+def catalog_validators(view, request, *args, **kwargs):
+    # the aggregate is cached under the catalog version, which is read from the
+    # database at most every CACHE_VERSION_TTL seconds, so warm requests cost no query
+    def build():
+        stats = Product.objects.aggregate(last_modified=Max("updated_at"), count=Count("id"))
+        return (stats["last_modified"], stats["count"])
+
+    last_modified, count = cached_catalog_payload(catalog_key("validators"), build)
+    return make_etag("catalog", last_modified, count), last_modified
+
+
+def product_validators(view, request, *args, **kwargs):
+    pk = kwargs[view.lookup_field]
+    try:
+        last_modified = Product.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+    except (TypeError, ValueError):
+        last_modified = None
+
+    if last_modified is None:
+        # let the view produce the 404
+        return None, None
+    return make_etag("product", pk, last_modified), last_modified
 
 
 @extend_schema(tags=['Products'])
 @extend_schema_view(
     list=extend_schema(
         summary="List all products",
-        description="Returns a paginated list of all products available in the store.",
+        description=(
+            "Returns a paginated list of all products available in the store. "
+            "Uses limit/offset by default; pass `pagination=cursor` for keyset "
+            "pages ordered by newest first, without a total count."
+        ),
         responses={200: ProductSerializer(many=True)}
     ),
     retrieve=extend_schema(
@@ -36,15 +71,64 @@ from .serializers import ProductSerializer
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all().order_by('-id')
     serializer_class = ProductSerializer
-    
+    pagination_class = CatalogPagination
+
     def get_permissions(self):
         """
-        list/retrieve: Allow ANYONE (Public)
+        list/retrieve/search: Allow ANYONE (Public)
         create/update/destroy: Allow only ADMINS
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'search']:
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAdminUser]
             
-        return [permission() for permission in permission_classes]
\ No newline at end of file
+        return [permission() for permission in permission_classes]
+
+    @conditional(catalog_validators)
+    def list(self, request, *args, **kwargs):
+        # the full url is part of the key since pagination links are absolute
+        key = catalog_key("list", request.build_absolute_uri())
+        build_page = super().list
+        data = cached_catalog_payload(key, lambda: build_page(request, *args, **kwargs).data)
+        return Response(data)
+
+    @conditional(product_validators)
+    def retrieve(self, request, *args, **kwargs):
+        key = catalog_key("detail", kwargs[self.lookup_field])
+        build_detail = super().retrieve
+        data = cached_catalog_payload(key, lambda: build_detail(request, *args, **kwargs).data)
+        return Response(data)
+
+    class SearchInputSerializer(serializers.Serializer):
+        q = serializers.CharField(min_length=1, max_length=200)
+        limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
+        offset = serializers.IntegerField(min_value=0, max_value=1000, default=0)
+
+    @extend_schema(
+        summary="Search products",
+        description=(
+            "Full-text search over product name and description. Terms are "
+            "prefix-matched and results are ranked by relevance, name matches first."
+        ),
+        parameters=[SearchInputSerializer],
+        responses={200: inline_serializer(
+            name="ProductSearchResponse",
+            fields={"results": ProductSerializer(many=True)},
+        )},
+    )
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        params = self.SearchInputSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        products = search_products(
+            params.validated_data["q"],
+            limit=params.validated_data["limit"],
+            offset=params.validated_data["offset"],
+        )
+
+        return Response(
+            {"results": ProductSerializer(products, many=True).data},
+            status=status.HTTP_200_OK,
+        )
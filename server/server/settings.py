@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from corsheaders.defaults import default_headers
 from datetime import timedelta
@@ -43,8 +44,13 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_HEADERS = (
     *default_headers,
+    "x-cart-token",
+    "idempotency-key",
 )
 
+# lets the frontend read the guest cart token it is handed (see orders/guest.py)
+CORS_EXPOSE_HEADERS = ["X-Cart-Token"]
+
 CSRF_TRUSTED_ORIGINS = ["http://localhost:3000",
     "https://exclude-refers-mostly-meat.trycloudflare.com"
 ]
@@ -67,7 +73,8 @@ INSTALLED_APPS = [
     'coupons',
     'users',
     'authentication',
-    'store'
+    'store',
+    'common'
 ]
 
 MIDDLEWARE = [
@@ -141,9 +148,88 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # IMMEDIATE: transactions take the write lock up front and wait for it,
+        # instead of failing with "database is locked" when they upgrade to it
+        'OPTIONS': {'timeout': 30, 'transaction_mode': 'IMMEDIATE'},
+        # a file, not the default in-memory database, so the concurrency
+        # tests' threads get their own connections with real locking
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# per-process is enough for cached API responses: their keys carry a version
+# kept in the database (see common/cache.py), so every process sees a bump
+# within CACHE_VERSION_TTL
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'checkout-default',
     }
 }
 
+# alias + default timeout (seconds) used for cached API responses
+API_CACHE_ALIAS = 'default'
+API_CACHE_TIMEOUT = 300
+# seconds a process reuses a cache version before reading it again
+CACHE_VERSION_TTL = 2
+
+
+# Stripe
+# dotted path of the client class, see common/stripe_client.py
+STRIPE_CLIENT = os.getenv("STRIPE_CLIENT", "common.stripe_client.StripeClient")
+STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
+# points the client at another API host, e.g. the fake server used by bench_checkout
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE")
+
+# per call timeout (seconds) and HTTP connection pool size of the real client
+STRIPE_TIMEOUT = 10
+STRIPE_POOL_SIZE = 20
+# retries on connection errors, 5xx and 429 (a SyncEngine retries its own 429s);
+# the breaker opens after this many straight failures and fails fast for
+# STRIPE_BREAKER_RESET seconds
+STRIPE_MAX_RETRIES = 2
+STRIPE_BREAKER_THRESHOLD = 5
+STRIPE_BREAKER_RESET = 30
+
+# concurrency and request budget for bulk Stripe syncs (see common/sync_engine.py)
+STRIPE_SYNC_WORKERS = 8
+STRIPE_SYNC_RATE = 25
+
+
+# webhook events are processed on this many threads by `manage.py
+# process_stripe_events`, or with STRIPE_EVENTS_IN_PROCESS=1 by a thread in
+# each process
+STRIPE_EVENT_WORKERS = 4
+STRIPE_EVENTS_IN_PROCESS = os.getenv("STRIPE_EVENTS_IN_PROCESS", "0") == "1"
+
+# expired coupon reservations are swept by `manage.py sweep_coupons --loop`, or
+# with COUPON_SWEEP_IN_PROCESS=1 by a thread in each process; every
+# COUPON_SWEEP_INTERVAL seconds, their Stripe coupons deleted at most this fast
+COUPON_SWEEP_IN_PROCESS = os.getenv("COUPON_SWEEP_IN_PROCESS", "0") == "1"
+COUPON_SWEEP_INTERVAL = int(os.getenv("COUPON_SWEEP_INTERVAL", "60"))
+COUPON_SWEEP_STRIPE_RATE = 5
+
+
+# key-value store for guest carts (see common/kv.py), it has to be shared by
+# every worker, a per-process store loses carts between requests
+KV_STORE = os.getenv("KV_STORE", "common.kv.DatabaseStore")
+
+# guest carts expire this many seconds after their last change
+GUEST_CART_TTL = 7 * 24 * 60 * 60
+
+# how long a stored Idempotency-Key response is replayed (see common/idempotency.py)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+# a request that hasn't stored its response after this many seconds is taken
+# for dead and a retry with its key runs again; longer than any request
+IDEMPOTENCY_LEASE = 120
+
+# per-process cache of StoreSettings values, e.g. nth_order (see store/cache.py)
+STORE_SETTINGS_TTL = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
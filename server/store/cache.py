@@ -0,0 +1,31 @@
+"""
+In-process cache of StoreSettings values.
+
+Coupon generation reads `nth_order` on every request, so the value is kept
+per process for STORE_SETTINGS_TTL seconds. Saving or deleting a setting
+drops the cached value right away in the process that did it (see
+store/signals.py); other processes pick the change up when their TTL runs
+out.
+"""
+from django.conf import settings
+
+from common.kv import InMemoryStore
+
+from .models import StoreSettings
+
+_cache = InMemoryStore()
+_MISSING = object()
+
+
+def get_setting(key):
+    """the setting's value, None if it doesn't exist"""
+    value = _cache.get(key, _MISSING)
+    if value is _MISSING:
+        # a missing setting is cached too, it's asked for just as often
+        value = StoreSettings.objects.filter(key=key).values_list("value", flat=True).first()
+        _cache.set(key, value, ttl=settings.STORE_SETTINGS_TTL)
+    return value
+
+
+def invalidate(key):
+    _cache.delete(key)
@@ -0,0 +1,59 @@
+"""
+The global order counter behind the nth-order promotion.
+
+Every paid order moves it by one, and coupon generation reads it to find the
+next slot. Both used to lock the single GlobalOrderCounter row with
+`select_for_update().get_or_create()`, which serialized the two busiest flows.
+
+- `increment()` is one `UPDATE ... SET current_count = current_count + 1
+  RETURNING current_count`: the row lock is held for a single statement
+  instead of a read, a save and the rest of the transaction, and every caller
+  still gets its own exact position, so "the nth order" stays well defined
+- `current()` is a plain read; coupon generation only peeks at the next slot,
+  and claiming it is `PromotionSlot.objects.claim()`, a conditional
+  `UPDATE ... WHERE claimed_by IS NULL` that only one user can win
+
+Sharded rows were ruled out: summing them gives the total, but not which
+order was the nth one.
+"""
+from django.db import connection, transaction
+
+from .models import GlobalOrderCounter
+
+ORDER_COUNTER = 1
+
+
+def increment(counter_id=ORDER_COUNTER, by=1):
+    """adds `by` to the counter and returns the new value, creating it if needed"""
+    table = connection.ops.quote_name(GlobalOrderCounter._meta.db_table)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # UPDATE ... RETURNING; can_return_columns_from_insert only covers INSERT
+            # (MariaDB has INSERT ... RETURNING but not UPDATE ... RETURNING)
+            if connection.vendor in ("postgresql", "sqlite"):
+                cursor.execute(
+                    f"UPDATE {table} SET current_count = current_count + %s WHERE id = %s RETURNING current_count",
+                    [by, counter_id],
+                )
+                row = cursor.fetchone()
+            else:
+                # no UPDATE ... RETURNING (MySQL, MariaDB): the UPDATE holds the row lock, so the read is still ours
+                cursor.execute(f"UPDATE {table} SET current_count = current_count + %s WHERE id = %s", [by, counter_id])
+                row = None
+                if cursor.rowcount:
+                    cursor.execute(f"SELECT current_count FROM {table} WHERE id = %s", [counter_id])
+                    row = cursor.fetchone()
+
+        if row is not None:
+            return row[0]
+
+    # first order ever: create the row (racing creators are sorted out by get_or_create), then count
+    GlobalOrderCounter.objects.get_or_create(id=counter_id)
+    return increment(counter_id, by)
+
+
+def current(counter_id=ORDER_COUNTER):
+    """the counter's value without locking it"""
+    value = GlobalOrderCounter.objects.filter(id=counter_id).values_list("current_count", flat=True).first()
+    return value or 0
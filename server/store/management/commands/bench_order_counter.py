@@ -0,0 +1,134 @@
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, transaction
+
+from store import counters
+from store.models import GlobalOrderCounter
+
+
+def locked_increment(hold):
+    """what the webhook used to do: lock the row first, then the rest of the transaction"""
+    with transaction.atomic():
+        counter, _ = GlobalOrderCounter.objects.select_for_update().get_or_create(id=1)
+        counter.current_count += 1
+        counter.save()
+        time.sleep(hold)
+    return counter.current_count
+
+
+def locked_peek():
+    """what coupon generation used to do"""
+    with transaction.atomic():
+        counter, _ = GlobalOrderCounter.objects.select_for_update().get_or_create(id=1)
+        return counter.current_count
+
+
+def update_increment(hold):
+    with transaction.atomic():
+        time.sleep(hold)
+        return counters.increment()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, len(values) * p // 100)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the global order counter under concurrency on a throwaway database: '
+        'the old select_for_update row lock vs an atomic UPDATE ... RETURNING'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--ops', type=int, default=200, help='Operations per worker')
+        parser.add_argument('--read-share', type=float, default=0.5,
+                            help='Share of operations that are coupon peeks rather than paid orders')
+        parser.add_argument('--hold', type=float, default=0.002,
+                            help='Seconds of other work in the paid order transaction')
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        if options['verbosity'] < 2:
+            # the dev settings log every query at DEBUG, which would skew the numbers
+            logging.getLogger().setLevel(logging.WARNING)
+        if connection.vendor == "sqlite":
+            # a file, not :memory:, so every worker thread sees the same database
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tempfile.mkdtemp(), "bench_order_counter.sqlite3")
+            connection.settings_dict["OPTIONS"].setdefault("timeout", 30)
+            self.stdout.write(self.style.WARNING(
+                "SQLite locks the whole database and ignores select_for_update, run against Postgres for real numbers"
+            ))
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            for mode, increment, peek in (
+                ("locked", locked_increment, locked_peek),
+                ("update", update_increment, counters.current),
+            ):
+                GlobalOrderCounter.objects.all().delete()
+                GlobalOrderCounter.objects.create(id=1)
+                connection.close()
+                self.run_mode(mode, increment, peek, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run_mode(self, mode, increment, peek, options):
+        lock = threading.Lock()
+        timings = {"increment": [], "peek": []}
+        returned = []
+        errors = 0
+
+        def worker(seed):
+            nonlocal errors
+            rng = random.Random(seed)
+            try:
+                for _ in range(options['ops']):
+                    kind = "peek" if rng.random() < options['read_share'] else "increment"
+                    started = time.perf_counter()
+                    try:
+                        value = peek() if kind == "peek" else increment(options['hold'])
+                    except Exception:
+                        with lock:
+                            errors += 1
+                        continue
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        timings[kind].append(elapsed)
+                        if kind == "increment":
+                            returned.append(value)
+            finally:
+                close_old_connections()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            list(pool.map(worker, range(options['workers'])))
+        wall = time.perf_counter() - started
+
+        final = GlobalOrderCounter.objects.get(id=1).current_count
+        connection.close()
+        # exact: every paid order got its own position, and none went missing
+        exact = final == len(returned) and sorted(returned) == list(range(1, final + 1))
+
+        total = len(timings["increment"]) + len(timings["peek"])
+        self.stdout.write(f"\n{mode}: {total} ops in {wall:.2f}s ({total / wall:.0f} ops/s), {errors} errors")
+        for kind, values in timings.items():
+            values.sort()
+            self.stdout.write(
+                f"  {kind:<10}{len(values):>7}  p50 {percentile(values, 50) * 1000:7.2f} ms"
+                f"  p95 {percentile(values, 95) * 1000:7.2f} ms  p99 {percentile(values, 99) * 1000:7.2f} ms"
+            )
+        style = self.style.SUCCESS if exact else self.style.ERROR
+        self.stdout.write(style(
+            f"  counter {final}, {len(returned)} increments, positions {'exact' if exact else 'NOT exact'}"
+        ))